@@ -0,0 +1,60 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.errors import AnsibleActionFail
+from ansible.module_utils.six import string_types
+from ansible.plugins.action import ActionBase
+from ansible.utils.vars import merge_hash
+
+
+class ActionModule(ActionBase):
+    ''' waits for a list of async jobs in one remote module run, see library/async_wait.py '''
+
+    TRANSFERS_FILES = False
+
+    def _get_async_dir(self):
+        # async directory based on the shell option, as for async_status
+        async_dir = self.get_shell_option('async_dir', default="~/.ansible_async")
+        return self._remote_expand_user(async_dir)
+
+    def _job_result(self, async_dir, status):
+        ''' what async_status would have returned for this job '''
+        result = dict(started=True, finished=False, stdout='', stderr='', stdout_lines=[], stderr_lines=[],
+                      ansible_job_id=status.get('ansible_job_id'),
+                      results_file=self._connection._shell.join_path(async_dir, status.get('ansible_job_id')))
+        result = merge_hash(result, status)
+        for convert in ('started', 'finished'):
+            result[convert] = bool(result[convert])
+        return result
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        module_args = self._task.args.copy()
+        jids = module_args.get('jids')
+        if isinstance(jids, string_types):
+            jids = [jid.strip() for jid in jids.split(',')]
+        if not isinstance(jids, list):
+            raise AnsibleActionFail('jids must be a list of async job ids')
+        if not jids:
+            result['results'] = []
+            return result
+
+        async_dir = self._get_async_dir()
+        module_args['jids'] = jids
+        module_args['_async_dir'] = async_dir
+        module_result = self._execute_module(module_name='async_wait', module_args=module_args, task_vars=task_vars)
+        if 'results' not in module_result:
+            return merge_hash(result, module_result)
+
+        result['results'] = [self._job_result(async_dir, status) for status in module_result['results']]
+        result['pending'] = module_result['pending']
+        result['polls'] = module_result['polls']
+        result['finished'] = not result['pending']
+        failed = [job['ansible_job_id'] for job in result['results'] if job.get('failed')]
+        if result['pending'] or failed:
+            result['failed'] = True
+            result['msg'] = '{0} of {1} jobs did not finish, {2} failed'.format(
+                len(result['pending']), len(jids), len(failed))
+        return result
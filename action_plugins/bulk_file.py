@@ -0,0 +1,38 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.errors import AnsibleActionFail
+from ansible.module_utils.six import string_types
+from ansible.plugins.action import ActionBase
+
+
+class ActionModule(ActionBase):
+    ''' validates and normalizes the path list, then hands all of it to one bulk_file module run '''
+
+    TRANSFERS_FILES = False
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args.copy()
+        paths = args.get('paths')
+        if isinstance(paths, string_types):
+            paths = [paths]
+        if not isinstance(paths, list) or not paths:
+            raise AnsibleActionFail('paths must be a non-empty list')
+
+        normalized = []
+        for item in paths:
+            if isinstance(item, string_types):
+                item = {'path': item}
+            elif not isinstance(item, dict) or not item.get('path'):
+                raise AnsibleActionFail('each item in paths must be a path or a dict with a path: %s' % (item,))
+            normalized.append(item)
+        args['paths'] = normalized
+
+        result.update(self._execute_module(module_name='bulk_file', module_args=args, task_vars=task_vars))
+        results = result.get('results', [])
+        result['changed_count'] = sum(1 for path in results if path.get('changed'))
+        result['failed_count'] = sum(1 for path in results if path.get('failed'))
+        return result
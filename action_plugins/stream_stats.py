@@ -0,0 +1,31 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible import constants as C
+from ansible.plugins.action.set_stats import ActionModule as SetStatsAction
+from ansible.utils.display import Display
+
+display = Display()
+
+
+def callback_enabled():
+    return any(name == 'stream_stats' or name.endswith('.stream_stats') for name in C.CALLBACKS_ENABLED or ())
+
+
+class ActionModule(SetStatsAction):
+    ''' set_stats, but the stats are left for the stream_stats callback to merge instead of the controller
+
+    Per host stats of a run_once task only apply to the host that ran it, where set_stats applies
+    them to every host of the play.
+    '''
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        if not callback_enabled():
+            # nothing would merge the stats, so they stay ordinary set_stats stats
+            display.warning('stream_stats: the stream_stats callback is not enabled, the stats are set as set_stats would')
+            return result
+        # without ansible_stats in the result the strategy has nothing to deep merge into its own stats
+        if 'ansible_stats' in result:
+            result['stream_stats'] = result.pop('ansible_stats')
+        return result
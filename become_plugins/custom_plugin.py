@@ -81,24 +81,46 @@ class BecomeModule(BecomeBase):
     fail = ('Sorry, try again.',)
     missing = ('Sorry, a password is required to run custom_plugin', 'custom_plugin: a password is required')
 
+    def __init__(self):
+        super(BecomeModule, self).__init__()
+        self._command_parts = None
+
+    def set_options(self, *args, **kwargs):
+        self._command_parts = None
+        super(BecomeModule, self).set_options(*args, **kwargs)
+
+    def set_option(self, *args, **kwargs):
+        self._command_parts = None
+        super(BecomeModule, self).set_option(*args, **kwargs)
+
+    def _get_command_parts(self):
+        """ everything in the command that only depends on options, resolved once per set of options """
+        if self._command_parts is None:
+            becomecmd = self.get_option('become_exe') or self.name
+
+            flags = self.get_option('become_flags') or ''
+            has_pass = bool(self.get_option('become_pass'))
+            if has_pass and flags:  # this could be simplified, but kept as is for now for backwards string matching
+                flags = flags.replace('-n', '')
+
+            user = self.get_option('become_user') or ''
+            if user:
+                user = '-u %s' % (user)
+
+            self._command_parts = (becomecmd, flags, has_pass, user)
+        return self._command_parts
+
     def build_become_command(self, cmd, shell):
         super(BecomeModule, self).build_become_command(cmd, shell)
 
         if not cmd:
             return cmd
 
-        becomecmd = self.get_option('become_exe') or self.name
-
-        flags = self.get_option('become_flags') or ''
+        becomecmd, flags, has_pass, user = self._get_command_parts()
         prompt = ''
-        if self.get_option('become_pass'):
+        if has_pass:
+            # the prompt carries the id generated for this command, so it is never cached
             self.prompt = '[custom_plugin via ansible, key=%s] password:' % self._id
-            if flags:  # this could be simplified, but kept as is for now for backwards string matching
-                flags = flags.replace('-n', '')
             prompt = '-p "%s"' % (self.prompt)
 
-        user = self.get_option('become_user') or ''
-        if user:
-            user = '-u %s' % (user)
-
         return ' '.join([becomecmd, flags, prompt, user, self._build_success_command(cmd, shell)])
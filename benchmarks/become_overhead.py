@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Controller-side cost of become: builds become commands for many host-tasks with
+become_plugins/custom_plugin.py and the built-in sudo plugin, the way the task
+executor does, with one set of options per host-task and a few commands each.
+
+    benchmarks/become_overhead.py --host-tasks 100000
+"""
+from argparse import ArgumentParser
+import os
+import time
+
+from ansible.plugins.loader import become_loader, shell_loader
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(plugin_name, host_tasks, commands_per_task, password):
+    ''' total time building commands, and the time spent in build_become_command alone '''
+    shell = shell_loader.get('sh')
+    options = {'become_user': 'root', 'become_flags': '-H -S -n'}
+    if password:
+        options['become_pass'] = 'secret'
+    build = 0.0
+    start = time.time()
+    for i in range(host_tasks):
+        plugin = become_loader.get(plugin_name)
+        plugin.set_options(direct=options)
+        build_start = time.time()
+        for n in range(commands_per_task):
+            plugin.build_become_command('/bin/sh -c "echo %d"' % n, shell)
+        build += time.time() - build_start
+    return time.time() - start, build
+
+
+def main():
+    parser = ArgumentParser(description='Compare become command building for custom_plugin and sudo.')
+    parser.add_argument('--host-tasks', type=int, default=100000)
+    parser.add_argument('--commands-per-task', type=int, default=3,
+                        help='low level commands per task, e.g. mkdir, module and cleanup without pipelining')
+    parser.add_argument('--plugins', nargs='+', default=['custom_plugin', 'sudo'])
+    args = parser.parse_args()
+
+    become_loader.add_directory(os.path.join(REPO, 'become_plugins'))
+
+    print('{:<14} {:>8} {:>10} {:>10} {:>12}'.format('plugin', 'password', 'total', 'build', 'us/command'))
+    for password in (False, True):
+        for plugin_name in args.plugins:
+            total, build = run(plugin_name, args.host_tasks, args.commands_per_task, password)
+            print('{:<14} {:>8} {:>9.2f}s {:>9.2f}s {:>12.2f}'.format(
+                plugin_name, 'yes' if password else 'no', total, build,
+                build * 1e6 / (args.host_tasks * args.commands_per_task)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Throughput mode for chatty_tasks.yml: floods the event stream with num_messages
+debug items per host and reports events/sec for each stdout callback.
+
+    benchmarks/event_throughput.py --num-messages 100000 --callbacks default jsonl_sink jsonl_sink:gzip
+"""
+from argparse import ArgumentParser
+import os
+import shutil
+import tempfile
+
+from playbook_run import REPO, fail, run_playbook, write_inventory
+
+
+def run(callback, inventory, num_messages, forks, workdir):
+    ''' runs chatty_tasks.yml with the given stdout callback, returns the wall time '''
+    name, _, variant = callback.partition(':')
+    env = dict(os.environ, ANSIBLE_STDOUT_CALLBACK=name,
+               JSONL_SINK_PATH=os.path.join(workdir, 'events.jsonl' + ('.gz' if variant == 'gzip' else '')),
+               JSONL_SINK_COMPRESS=str(variant == 'gzip'))
+    cmd = ['ansible-playbook', '-i', inventory, '-f', str(forks), '-e', 'num_messages={}'.format(num_messages),
+           os.path.join(REPO, 'chatty_tasks.yml')]
+    log = os.path.join(workdir, 'stdout')
+    rc, elapsed, _ = run_playbook(cmd, log, env)
+    if rc:
+        fail(log, '{} run failed with rc {}'.format(callback, rc))
+    return elapsed
+
+
+def parse_args():
+    parser = ArgumentParser(description='Report events/sec of stdout callbacks on chatty_tasks.yml.')
+    parser.add_argument('--num-messages', type=int, default=100000)
+    parser.add_argument('--hosts', type=int, default=1)
+    parser.add_argument('--forks', type=int, default=5)
+    parser.add_argument('--callbacks', nargs='+', default=['default', 'jsonl_sink', 'jsonl_sink:gzip'],
+                        help='stdout callbacks to compare, jsonl_sink:gzip enables compression')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='event_throughput.')
+    try:
+        inventory = write_inventory(workdir, args.hosts, prefix='chatty_host_')
+        # one event per loop item and host, plus the task's own result per host
+        events = (args.num_messages + 1) * args.hosts
+        for callback in args.callbacks:
+            elapsed = run(callback, inventory, args.num_messages, args.forks, workdir)
+            print('{:<16} {:>10} events {:>8.2f}s {:>10.0f} events/sec'.format(
+                callback, events, elapsed, events / elapsed))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Populates a fact cache with synthetic facts for many hosts, then compares the
+jsonfile and sharded cache plugins on populate time, disk footprint, and cold
+load time for one host (what use_facts.yml needs) and for every host.
+
+    benchmarks/fact_cache.py --hosts 10000
+"""
+from argparse import ArgumentParser
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from ansible.plugins.loader import cache_loader
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# runs in a fresh interpreter so every load starts with a cold plugin
+COLD_LOAD = '''
+import sys, time
+from ansible.plugins.loader import cache_loader
+cache_loader.add_directory(sys.argv[1])
+cache = cache_loader.get(sys.argv[2], _uri=sys.argv[3], _prefix='')
+start = time.time()
+if sys.argv[4] == 'one':
+    cache.get(sys.argv[5])
+else:
+    for key in cache.keys():
+        cache.get(key)
+print(time.time() - start)
+'''
+
+
+def host_facts(seed):
+    ''' roughly the shape and size of setup facts from a real host '''
+    rand = random.Random(seed)
+    facts = {'ansible_hostname': 'host-%05d' % seed,
+             'ansible_distribution': rand.choice(['RedHat', 'CentOS', 'Ubuntu']),
+             'ansible_machine': 'x86_64',
+             'ansible_system': 'Linux',
+             'ansible_date_time': {'time': '12:%02d:%02d' % (rand.randint(0, 59), rand.randint(0, 59))},
+             'ansible_env': dict(('VAR_%d' % i, '/opt/%x' % rand.getrandbits(64)) for i in range(40)),
+             'ansible_mounts': [{'mount': '/mnt/%d' % i, 'size_total': rand.getrandbits(40),
+                                 'size_available': rand.getrandbits(38), 'fstype': 'xfs'} for i in range(10)],
+             'ansible_interfaces': ['eth%d' % i for i in range(4)],
+             'ansible_packages': dict(('pkg%d' % i, [{'version': '%d.%d' % (rand.randint(0, 9), i)}])
+                                      for i in range(150))}
+    for i in range(4):
+        facts['ansible_eth%d' % i] = {'ipv4': {'address': '10.%d.%d.%d' % (i, seed // 256 % 256, seed % 256)},
+                                      'macaddress': '52:54:00:%02x:%02x:%02x' % (i, seed // 256 % 256, seed % 256)}
+    return facts
+
+
+def disk_usage(directory):
+    files = [os.path.join(directory, name) for name in os.listdir(directory)]
+    return len(files), sum(os.path.getsize(path) for path in files)
+
+
+def cold_load(plugin, directory, what, key=''):
+    out = subprocess.check_output([sys.executable, '-c', COLD_LOAD, os.path.join(REPO, 'cache_plugins'),
+                                   plugin, directory, what, key])
+    return float(out.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = ArgumentParser(description='Compare the jsonfile and sharded fact cache plugins.')
+    parser.add_argument('--hosts', type=int, default=10000)
+    parser.add_argument('--plugins', nargs='+', default=['jsonfile', 'sharded'])
+    args = parser.parse_args()
+
+    cache_loader.add_directory(os.path.join(REPO, 'cache_plugins'))
+
+    facts = [host_facts(seed) for seed in range(args.hosts)]
+    workdir = tempfile.mkdtemp(prefix='fact_cache.')
+    try:
+        print('{:<10} {:>10} {:>8} {:>12} {:>10} {:>10}'.format(
+            'plugin', 'populate', 'files', 'bytes', 'load one', 'load all'))
+        for plugin in args.plugins:
+            directory = os.path.join(workdir, plugin)
+            cache = cache_loader.get(plugin, _uri=directory, _prefix='')
+            start = time.time()
+            for seed, data in enumerate(facts):
+                cache.set('host-%05d' % seed, data)
+            populate = time.time() - start
+            files, size = disk_usage(directory)
+            one = cold_load(plugin, directory, 'one', 'host-%05d' % (args.hosts // 2))
+            everything = cold_load(plugin, directory, 'all')
+            print('{:<10} {:>9.2f}s {:>8} {:>12} {:>9.3f}s {:>9.2f}s'.format(
+                plugin, populate, files, size, one, everything))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
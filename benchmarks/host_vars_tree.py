@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Generates an INI inventory with a large group_vars/host_vars tree next to it:
+one host_vars file per host, some of them as directories of several files, and
+one group_vars file per group.
+
+    benchmarks/host_vars_tree.py /tmp/tree --hosts 5000 --groups 50 --vars-per-file 20
+"""
+from argparse import ArgumentParser
+import os
+import random
+
+
+def write_tree(directory, num_hosts, num_groups, vars_per_file, seed=0):
+    ''' writes hosts.ini, group_vars/ and host_vars/ under directory, returns the inventory path '''
+    rand = random.Random(seed)
+    for subdir in ('group_vars', 'host_vars'):
+        os.makedirs(os.path.join(directory, subdir), exist_ok=True)
+
+    def write_vars(path, prefix):
+        with open(path, 'w') as f:
+            f.write('---\n')
+            for i in range(vars_per_file):
+                kind = i % 4
+                if kind == 0:
+                    f.write('{}_{}: value-{:x}\n'.format(prefix, i, rand.getrandbits(48)))
+                elif kind == 1:
+                    f.write('{}_{}: {}\n'.format(prefix, i, rand.randint(0, 100000)))
+                elif kind == 2:
+                    f.write('{}_{}:\n  - "{{{{ inventory_hostname }}}}"\n  - {}\n'.format(prefix, i, rand.random()))
+                else:
+                    f.write('{}_{}:\n  name: n{}\n  enabled: {}\n'.format(prefix, i, i, rand.choice(['true', 'false'])))
+
+    groups = {}
+    for h in range(num_hosts):
+        host = 'tree_host_{:05d}'.format(h)
+        groups.setdefault('tree_group_{:03d}'.format(h % num_groups), []).append(host)
+        if h % 10 == 0:
+            # a directory of vars files rather than a single file
+            host_dir = os.path.join(directory, 'host_vars', host)
+            os.makedirs(host_dir, exist_ok=True)
+            write_vars(os.path.join(host_dir, 'main.yml'), 'host_main')
+            write_vars(os.path.join(host_dir, 'extra.yml'), 'host_extra')
+        else:
+            write_vars(os.path.join(directory, 'host_vars', host + '.yml'), 'host')
+
+    for group in groups:
+        write_vars(os.path.join(directory, 'group_vars', group + '.yml'), 'group')
+    write_vars(os.path.join(directory, 'group_vars', 'all.yml'), 'all')
+
+    path = os.path.join(directory, 'hosts.ini')
+    with open(path, 'w') as f:
+        for group, hosts in sorted(groups.items()):
+            f.write('[{}]\n{}\n\n'.format(group, '\n'.join(hosts)))
+    return path
+
+
+def main():
+    parser = ArgumentParser(description='Generate an inventory with a large group_vars/host_vars tree.')
+    parser.add_argument('directory')
+    parser.add_argument('--hosts', type=int, default=5000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--vars-per-file', type=int, default=20)
+    args = parser.parse_args()
+    print(write_tree(args.directory, args.hosts, args.groups, args.vars_per_file))
+
+
+if __name__ == '__main__':
+    main()
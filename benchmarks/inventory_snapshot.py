@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+Checks that inventory snapshots round-trip, then times a --limit run against a
+large generated snapshot.
+
+Each inventory is exported with utils/export_inventory_snapshot.py and
+ansible-inventory --list must give the same output for the snapshot as for the
+inventory itself, on its own and with each of a few limits, also with the
+snapshot plugin's narrow_limit on. ansible-inventory only shows the hosts a limit
+selects, so a playbook also dumps groups and hostvars under each limit, which
+must match without narrow_limit. The snapshot is written next to the inventory
+so both see the same group_vars and host_vars.
+
+    benchmarks/inventory_snapshot.py --hosts 500000 --groups 500
+"""
+from argparse import ArgumentParser
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INVENTORIES = [
+    'inventories/inventory.ini',
+    'inventories/for_gen_host_status.ini',
+    'inventories/dyn_inventory.py',
+]
+LIMITS = [
+    'group_one_host_03',
+    'group_two',
+    'group_one:!group_two',
+    'group_one:&group_three',
+    '~.*three.*0[12]',
+    'group_t*',
+    'group_one[0:2]',
+    '!group_one',
+    'ungrouped_host_02,host_2',
+]
+
+# dumps what a play sees of the inventory, the extra var out names the file, vars naming the source are left out
+CHECK_PLAYBOOK = '''
+- hosts: all
+  gather_facts: false
+  tasks:
+  - copy:
+      dest: "{{ out }}"
+      content: "{{ {'groups': groups, 'hostvars': dict(groups['all'] | zip(groups['all'] | map('extract', hostvars)
+                   | map('dict2items') | map('rejectattr', 'key', 'in', skipped) | map('items2dict')))} | to_json }}"
+    vars:
+      skipped: [inventory_file, inventory_dir, ansible_inventory_sources, out]
+    run_once: true
+    delegate_to: localhost
+'''
+
+
+def inventory_env(narrow):
+    return dict(os.environ, ANSIBLE_INVENTORY_PLUGINS=os.path.join(REPO, 'inventories', 'user_plugins', 'inventory_plugins'),
+                ANSIBLE_INVENTORY_ENABLED='snapshot,script,ini', SNAPSHOT_NARROW_LIMIT=str(narrow))
+
+
+def run_inventory(inventory, workdir, *args, narrow=False):
+    ''' returns the wall time and the ansible-inventory output '''
+    output = os.path.join(workdir, 'inventory.out')
+    # ansible-inventory fails on non-blocking stdout, so write to a file
+    with open(output, 'w') as out, open(os.path.join(workdir, 'stderr'), 'w') as err:
+        start = time.time()
+        rc = subprocess.call(['ansible-inventory', '-i', inventory] + list(args), env=inventory_env(narrow),
+                             stdin=subprocess.DEVNULL, stdout=out, stderr=err)
+        elapsed = time.time() - start
+    if rc:
+        with open(os.path.join(workdir, 'stderr')) as err:
+            sys.stderr.write(err.read()[-2000:])
+        raise SystemExit('ansible-inventory -i {} failed with rc {}'.format(inventory, rc))
+    with open(output) as f:
+        return elapsed, f.read()
+
+
+def play_view(inventory, workdir, *args):
+    ''' groups and hostvars as CHECK_PLAYBOOK sees them, None if the limit selects no host '''
+    playbook = os.path.join(workdir, 'check.yml')
+    if not os.path.exists(playbook):
+        with open(playbook, 'w') as f:
+            f.write(CHECK_PLAYBOOK)
+    dump = os.path.join(workdir, 'play_view.json')
+    log = os.path.join(workdir, 'stderr')
+    with open(log, 'w') as out:
+        rc = subprocess.call(['ansible-playbook', '-i', inventory, playbook, '-e', 'out={}'.format(dump)] + list(args),
+                             env=inventory_env(False), stdin=subprocess.DEVNULL, stdout=out, stderr=out)
+    if not os.path.exists(dump):
+        with open(log) as out:
+            output = out.read()
+        # a limit that selects no host fails the run before the play starts
+        if 'no hosts to target' in output or 'no hosts matched' in output:
+            return None
+        sys.stderr.write(output[-2000:])
+        raise SystemExit('ansible-playbook -i {} failed with rc {}'.format(inventory, rc))
+    with open(dump) as f:
+        view = json.load(f)
+    os.remove(dump)
+    return view
+
+
+def listing(inventory, workdir, *args, narrow=False):
+    ''' the --list output, without the vars that name the inventory file '''
+    data = json.loads(run_inventory(inventory, workdir, '--list', *args, narrow=narrow)[1])
+    for hostvars in data['_meta']['hostvars'].values():
+        hostvars.pop('inventory_file', None)
+        hostvars.pop('inventory_dir', None)
+    return data
+
+
+def check_round_trip(inventory, workdir):
+    ''' returns the number of differing runs '''
+    source = os.path.join(REPO, inventory)
+    snapshot = os.path.join(os.path.dirname(source), '.{}.snapshot.json'.format(os.path.basename(source)))
+    subprocess.check_call([sys.executable, os.path.join(REPO, 'utils', 'export_inventory_snapshot.py'),
+                           '-i', source, '-o', snapshot], stdin=subprocess.DEVNULL)
+    failed = 0
+    try:
+        for limit in [None] + LIMITS:
+            args = ['--limit', limit] if limit else []
+            expected = listing(source, workdir, *args)
+            results = [expected == listing(snapshot, workdir, *args),
+                       expected == listing(snapshot, workdir, *args, narrow=True),
+                       play_view(source, workdir, *args) == play_view(snapshot, workdir, *args)]
+            failed += results.count(False)
+            print('{:<40} {:<26} {:<8} {:<8} {}'.format(
+                inventory, limit or '-', *('same' if same else 'DIFFERS' for same in results)))
+    finally:
+        os.remove(snapshot)
+    return failed
+
+
+def write_snapshot(path, hosts, groups):
+    ''' a snapshot of hosts split into groups of consecutive hosts, each host in exactly one group '''
+    per_group = -(-hosts // groups)
+    data = {'plugin': 'snapshot', 'version': 1, 'hostvars': {}, 'groups': {
+        'all': {'vars': {'ansible_connection': 'local'}, 'children': [], 'hosts': []},
+    }}
+    for group in range(groups):
+        first = group * per_group + 1
+        last = min(first + per_group - 1, hosts)
+        if first > last:
+            break
+        name = 'group_{:04d}'.format(group)
+        data['groups']['all']['children'].append(name)
+        data['groups'][name] = {'vars': {'group_number': group}, 'children': [],
+                                'hosts': [['host_', first, last, 7, '']]}
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def main():
+    parser = ArgumentParser(description='Check snapshot round trips and time --limit against a large snapshot.')
+    parser.add_argument('--hosts', type=int, default=500000)
+    parser.add_argument('--groups', type=int, default=500)
+    parser.add_argument('--full', action='store_true', help='also time the large snapshot without a limit')
+    parser.add_argument('--skip-check', action='store_true', help='only time the large snapshot')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='inventory_snapshot.')
+    try:
+        failed = 0
+        if not args.skip_check:
+            print('{:<40} {:<26} {:<8} {:<8} {}'.format('inventory', 'limit', '--list', 'narrowed', 'playbook'))
+            for inventory in INVENTORIES:
+                failed += check_round_trip(inventory, workdir)
+            print('')
+
+        snapshot = os.path.join(workdir, 'large.snapshot.json')
+        write_snapshot(snapshot, args.hosts, args.groups)
+        one_host = ['--limit', 'host_{:07d}'.format(args.hosts // 2)]
+        runs = [('--limit one host', one_host, True),
+                ('--limit one group', ['--limit', 'group_{:04d}'.format(args.groups // 2)], True),
+                ('--limit regex', ['--limit', '~host_000000[0-9]$'], True),
+                ('--limit one host, full', one_host, False)]
+        if args.full:
+            runs.append(('no limit', [], False))
+        print('{:<24} {:>10} {:>10}'.format('{} hosts'.format(args.hosts), 'time', 'hosts'))
+        for name, limit, narrow in runs:
+            elapsed, output = run_inventory(snapshot, workdir, '--graph', *limit, narrow=narrow)
+            print('{:<24} {:>9.2f}s {:>10}'.format(name, elapsed, output.count('--host_')))
+    finally:
+        shutil.rmtree(workdir)
+    if failed:
+        raise SystemExit('{} round trips differ'.format(failed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Runs gen_host_status.yml over a sweep of host counts with the memory_profile
+callback from callback_plugins/, and reports how controller memory grows with
+the number of hosts: peak RSS, RSS and traced memory when the stats are sent,
+and a least squares fit of each in KB per host. A steady KB per host that does
+not level off points at a per-host leak, and the areas that grew most in the
+largest run say where to look.
+
+    benchmarks/memory_sweep.py --hosts 100 500 1000 2000 5000 --csv memory.csv --png memory.png
+"""
+from argparse import ArgumentParser
+import csv
+import json
+import os
+import shutil
+import tempfile
+
+from playbook_run import REPO, fail, run_playbook, write_inventory
+
+# the outcomes gen_host_status.yml picks by host name, unreachable hosts are left out
+# since reaching out to them only measures DNS timeouts
+OUTCOMES = ['ok', 'skipped', 'changed', 'failed', 'ignored', 'rescued']
+
+PLOT_WIDTH = 60
+
+
+def run(num_hosts, args, workdir):
+    ''' runs gen_host_status.yml once, returns its row of results '''
+    inventory = write_inventory(workdir, num_hosts, hosts=('{:06d}_{}'.format(number, OUTCOMES[number % len(OUTCOMES)])
+                                                           for number in range(1, num_hosts + 1)))
+    report = os.path.join(workdir, 'memory_profile.json')
+    env = dict(os.environ, ANSIBLE_CALLBACKS_ENABLED='memory_profile',
+               ANSIBLE_CALLBACK_PLUGINS=os.path.join(REPO, 'callback_plugins'),
+               MEMORY_PROFILE_OUTPUT_FILE=report, MEMORY_PROFILE_TRACE=str(not args.rss_only),
+               MEMORY_PROFILE_SAMPLES='play,stats' if args.no_task_samples else 'play,task,stats')
+    cmd = ['ansible-playbook', '-i', inventory, '-f', str(args.forks), os.path.join(REPO, 'gen_host_status.yml')]
+    log = os.path.join(workdir, 'stdout')
+    rc, elapsed, peak_rss_kb = run_playbook(cmd, log, env)
+    # failed hosts are part of the playbook, so rc 2 is expected
+    if rc not in (0, 2) or not os.path.exists(report):
+        fail(log, 'run with {} hosts failed with rc {}'.format(num_hosts, rc))
+    with open(report) as f:
+        report = json.load(f)
+    os.remove(os.path.join(workdir, 'memory_profile.json'))
+    stats = report['samples'][-1]
+    return {'hosts': num_hosts, 'time': round(elapsed, 3), 'peak_rss_kb': peak_rss_kb,
+            'stats_rss_kb': stats['rss_kb'], 'traced_kb': stats.get('traced_kb'),
+            'traced_peak_kb': stats.get('traced_peak_kb'), 'growth': report.get('growth', {})}
+
+
+def slope(rows, field):
+    ''' least squares KB per host of field, None without two distinct host counts '''
+    points = [(row['hosts'], row[field]) for row in rows if row[field] is not None]
+    if len(set(hosts for hosts, _ in points)) < 2:
+        return None
+    mean_x = sum(hosts for hosts, _ in points) / float(len(points))
+    mean_y = sum(value for _, value in points) / float(len(points))
+    return (sum((hosts - mean_x) * (value - mean_y) for hosts, value in points)
+            / sum((hosts - mean_x) ** 2 for hosts, _ in points))
+
+
+def plot(rows, field):
+    ''' a bar per host count, scaled to the largest value '''
+    largest = max(row[field] for row in rows) or 1
+    for row in rows:
+        print('{:>7} |{:<{width}}| {:.1f} MB'.format(
+            row['hosts'], '#' * int(round(PLOT_WIDTH * row[field] / float(largest))), row[field] / 1024.0,
+            width=PLOT_WIDTH))
+
+
+def write_png(rows, path):
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        from matplotlib import pyplot
+    except ImportError:
+        raise SystemExit('--png needs matplotlib')
+    hosts = [row['hosts'] for row in rows]
+    for field, label in (('peak_rss_kb', 'peak RSS'), ('stats_rss_kb', 'RSS at stats'), ('traced_kb', 'traced at stats')):
+        if all(row[field] is not None for row in rows):
+            pyplot.plot(hosts, [row[field] / 1024.0 for row in rows], marker='o', label=label)
+    pyplot.xlabel('hosts')
+    pyplot.ylabel('MB')
+    pyplot.title('gen_host_status.yml controller memory')
+    pyplot.legend()
+    pyplot.savefig(path)
+
+
+def parse_args():
+    parser = ArgumentParser(description='Sweep gen_host_status.yml over host counts and profile controller memory.')
+    parser.add_argument('--hosts', type=int, nargs='+', default=[100, 250, 500, 1000])
+    parser.add_argument('--forks', type=int, default=5)
+    parser.add_argument('--rss-only', action='store_true', help='no tracemalloc, which adds to RSS and time')
+    parser.add_argument('--no-task-samples', action='store_true', help='only sample at play starts and stats')
+    parser.add_argument('--top', type=int, default=5, help='areas of the largest run to list')
+    parser.add_argument('--csv', help='write the results to this CSV file')
+    parser.add_argument('--png', help='plot memory against host count into this PNG, needs matplotlib')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rows = []
+    workdir = tempfile.mkdtemp(prefix='memory_sweep.')
+    try:
+        print('{:>7} {:>9} {:>13} {:>13} {:>11} {:>14}'.format(
+            'hosts', 'time', 'peak RSS MB', 'stats RSS MB', 'traced MB', 'traced peak MB'))
+        for num_hosts in sorted(args.hosts):
+            row = run(num_hosts, args, workdir)
+            rows.append(row)
+            print('{:>7} {:>8.2f}s {:>13.1f} {:>13.1f} {:>11} {:>14}'.format(
+                num_hosts, row['time'], row['peak_rss_kb'] / 1024.0, row['stats_rss_kb'] / 1024.0,
+                '-' if row['traced_kb'] is None else '{:.1f}'.format(row['traced_kb'] / 1024.0),
+                '-' if row['traced_peak_kb'] is None else '{:.1f}'.format(row['traced_peak_kb'] / 1024.0)))
+    finally:
+        shutil.rmtree(workdir)
+
+    print('')
+    for field in ('peak_rss_kb', 'stats_rss_kb', 'traced_kb'):
+        per_host = slope(rows, field)
+        if per_host is not None:
+            print('{:<14} {:>8.2f} KB per host'.format(field, per_host))
+    print('\npeak RSS')
+    plot(rows, 'peak_rss_kb')
+
+    areas = rows[-1]['growth'].get('areas', {})
+    if areas:
+        print('\ngrowth from the first sample to the stats with {} hosts, by area'.format(rows[-1]['hosts']))
+        for name, size_kb in list(areas.items())[:args.top]:
+            print('{:>10.1f} MB  {}'.format(size_kb / 1024.0, name))
+
+    if args.csv:
+        fields = ['hosts', 'time', 'peak_rss_kb', 'stats_rss_kb', 'traced_kb', 'traced_peak_kb']
+        with open(args.csv, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for row in rows:
+                writer.writerow([row[field] for field in fields])
+    if args.png:
+        write_png(rows, args.png)
+
+
+if __name__ == '__main__':
+    main()
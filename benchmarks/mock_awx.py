@@ -0,0 +1,756 @@
+#!/usr/bin/env python
+"""
+An in-memory stand-in for the AWX/Tower REST API, with just enough of /api/v2/
+for the task files in tower_modules/ to run offline: named objects that can be
+listed, filtered, created, changed, deleted and associated, object roles,
+settings, and job, project and inventory updates that go from pending to
+running to successful on their own.
+
+It counts requests per endpoint and connections, and keeps connections alive,
+so clients that pool connections reuse them.
+
+    benchmarks/mock_awx.py --port 8013
+    TOWER_HOST=http://127.0.0.1:8013 TOWER_USERNAME=admin TOWER_PASSWORD=password \\
+        ansible-playbook tower_modules/wrapper.yml -e tower_module_under_test=organization
+"""
+from argparse import ArgumentParser
+from collections import Counter, OrderedDict
+import base64
+import binascii
+import copy
+import datetime
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qsl, urlencode, urlsplit
+except ImportError:
+    raise SystemExit('mock_awx.py needs python 3.7 or later')
+
+VERSION = '11.2.0'
+
+# plural endpoint names and the type each of their objects reports
+RESOURCES = OrderedDict([
+    ('organizations', 'organization'), ('users', 'user'), ('teams', 'team'),
+    ('credential_types', 'credential_type'), ('credentials', 'credential'),
+    ('projects', 'project'), ('project_updates', 'project_update'),
+    ('inventories', 'inventory'), ('hosts', 'host'), ('groups', 'group'),
+    ('inventory_sources', 'inventory_source'), ('inventory_updates', 'inventory_update'),
+    ('job_templates', 'job_template'), ('jobs', 'job'), ('ad_hoc_commands', 'ad_hoc_command'),
+    ('labels', 'label'), ('notification_templates', 'notification_template'),
+    ('workflow_job_templates', 'workflow_job_template'),
+    ('workflow_job_template_nodes', 'workflow_job_template_node'), ('workflow_jobs', 'workflow_job'),
+    ('schedules', 'schedule'), ('instance_groups', 'instance_group'), ('roles', 'role'),
+    ('tokens', 'o_auth2_access_token'),
+])
+
+# lists over several resources, read only
+UNIFIED = {
+    'unified_job_templates': ('job_templates', 'projects', 'inventory_sources', 'workflow_job_templates'),
+    'unified_jobs': ('jobs', 'project_updates', 'inventory_updates', 'workflow_jobs', 'ad_hoc_commands'),
+}
+
+# fields that hold the id of another object, and where that object lives
+FOREIGN_KEYS = {
+    'organization': 'organizations', 'inventory': 'inventories', 'project': 'projects',
+    'source_project': 'projects', 'credential_type': 'credential_types', 'credential': 'credentials',
+    'webhook_credential': 'credentials', 'job_template': 'job_templates',
+    'workflow_job_template': 'workflow_job_templates', 'inventory_source': 'inventory_sources',
+    'unified_job_template': None, 'user': 'users', 'team': 'teams',
+}
+
+# sub-lists of an object that are the objects pointing back at it through a field
+BACK_REFERENCES = {
+    ('organizations', 'projects'): 'organization', ('organizations', 'inventories'): 'organization',
+    ('organizations', 'teams'): 'organization', ('organizations', 'credentials'): 'organization',
+    ('organizations', 'job_templates'): 'organization', ('organizations', 'labels'): 'organization',
+    ('organizations', 'notification_templates'): 'organization',
+    ('organizations', 'workflow_job_templates'): 'organization',
+    ('credential_types', 'credentials'): 'credential_type',
+    ('inventories', 'hosts'): 'inventory', ('inventories', 'groups'): 'inventory',
+    ('inventories', 'inventory_sources'): 'inventory',
+    ('projects', 'project_updates'): 'project', ('inventory_sources', 'inventory_updates'): 'inventory_source',
+    ('job_templates', 'jobs'): 'job_template', ('workflow_job_templates', 'workflow_jobs'): 'workflow_job_template',
+    ('workflow_job_templates', 'workflow_nodes'): 'workflow_job_template',
+}
+
+# sub-lists of an object that are plain associations, and the resource they list
+ASSOCIATIONS = {
+    'labels': 'labels', 'credentials': 'credentials', 'instance_groups': 'instance_groups',
+    'users': 'users', 'teams': 'teams', 'admins': 'users', 'hosts': 'hosts', 'groups': 'groups',
+    'children': 'groups', 'roles': 'roles', 'input_inventories': 'inventories',
+    'notification_templates_started': 'notification_templates',
+    'notification_templates_success': 'notification_templates',
+    'notification_templates_error': 'notification_templates',
+    'notification_templates_approvals': 'notification_templates',
+    'success_nodes': 'workflow_job_template_nodes', 'failure_nodes': 'workflow_job_template_nodes',
+    'always_nodes': 'workflow_job_template_nodes',
+}
+
+OBJECT_ROLES = {
+    'organizations': ('admin', 'execute', 'project_admin', 'inventory_admin', 'credential_admin',
+                      'workflow_admin', 'notification_admin', 'job_template_admin', 'auditor',
+                      'member', 'read', 'approval'),
+    'teams': ('admin', 'member', 'read'),
+    'projects': ('admin', 'use', 'update', 'read'),
+    'inventories': ('admin', 'update', 'adhoc', 'use', 'read'),
+    'credentials': ('admin', 'use', 'read'),
+    'job_templates': ('admin', 'execute', 'read'),
+    'workflow_job_templates': ('admin', 'execute', 'read', 'approval'),
+    'instance_groups': ('admin', 'use', 'read'),
+}
+
+# actions that start a job, and where the job goes
+LAUNCHES = {
+    ('job_templates', 'launch'): ('jobs', 'job_template'),
+    ('workflow_job_templates', 'launch'): ('workflow_jobs', 'workflow_job_template'),
+    ('projects', 'update'): ('project_updates', 'project'),
+    ('inventory_sources', 'update'): ('inventory_updates', 'inventory_source'),
+}
+
+# fields AWX always serializes for a resource, which the awx.awx modules read without a default
+DEFAULTS = {
+    'job_templates': dict([('ask_{}_on_launch'.format(prompt), False) for prompt in (
+        'scm_branch', 'diff_mode', 'limit', 'tags', 'skip_tags', 'job_type', 'verbosity', 'inventory',
+        'credential', 'variables')] + [('survey_enabled', False), ('extra_vars', '')]),
+    'workflow_job_templates': dict([('ask_{}_on_launch'.format(prompt), False) for prompt in (
+        'inventory', 'limit', 'scm_branch', 'variables')] + [('survey_enabled', False), ('extra_vars', '')]),
+}
+
+JOBS = ('jobs', 'project_updates', 'inventory_updates', 'workflow_jobs', 'ad_hoc_commands')
+
+LOOKUPS = ('exact', 'iexact', 'contains', 'icontains', 'startswith', 'istartswith', 'in', 'isnull')
+
+SETTINGS = {
+    'AWX_PROOT_ENABLED': True, 'AWX_PROOT_BASE_PATH': '/tmp', 'AWX_PROOT_SHOW_PATHS': [],
+    'AWX_PROOT_HIDE_PATHS': [], 'AWX_TASK_ENV': {}, 'CUSTOM_LOGIN_INFO': '', 'TOWER_URL_BASE': '',
+    'SESSION_COOKIE_AGE': 1800, 'AD_HOC_COMMANDS': ['command', 'shell', 'ping'],
+}
+LIST_SETTINGS = ('AWX_PROOT_SHOW_PATHS', 'AWX_PROOT_HIDE_PATHS', 'AD_HOC_COMMANDS')
+
+ID_IN_PATH = re.compile(r'/\d+/')
+
+
+def now():
+    return datetime.datetime.utcnow().isoformat() + 'Z'
+
+
+class NotFound(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    def __init__(self, errors):
+        Exception.__init__(self, errors)
+        self.errors = errors
+
+
+class Store(object):
+    ''' every object of every resource, by id, ids are unique across resources '''
+
+    def __init__(self, job_seconds=1.0, project_base_dir='/var/lib/awx/projects'):
+        self.lock = threading.RLock()
+        self.job_seconds = job_seconds
+        self.project_base_dir = project_base_dir
+        self.objects = OrderedDict()
+        self.kinds = {}
+        self.links = {}
+        self.settings = copy.deepcopy(SETTINGS)
+        self.last_id = 0
+        self.seed()
+
+    def seed(self):
+        ''' what a fresh AWX install starts with '''
+        org = self.create('organizations', {'name': 'Default', 'description': '', 'max_hosts': 0, 'custom_virtualenv': None})
+        self.create('users', {'username': 'admin', 'is_superuser': True, 'email': 'admin@example.com',
+                              'first_name': '', 'last_name': ''})
+        machine = None
+        for kind, name in (('ssh', 'Machine'), ('scm', 'Source Control'), ('vault', 'Vault'),
+                           ('net', 'Network'), ('cloud', 'Amazon Web Services'), ('cloud', 'VMware vCenter'),
+                           ('cloud', 'Red Hat Satellite 6'), ('cloud', 'OpenStack'), ('insights', 'Insights')):
+            created = self.create('credential_types', {'name': name, 'kind': kind, 'managed_by_tower': True,
+                                                       'inputs': {}, 'injectors': {}})
+            machine = machine or created
+        self.create('credentials', {'name': 'Demo Credential', 'credential_type': machine['id'],
+                                    'organization': None, 'inputs': {'username': 'admin'}})
+        self.create('projects', {'name': 'Demo Project', 'organization': org['id'], 'scm_type': 'git',
+                                 'scm_url': 'https://github.com/ansible/ansible-tower-samples'})
+        inventory = self.create('inventories', {'name': 'Demo Inventory', 'organization': org['id'], 'variables': ''})
+        self.create('hosts', {'name': 'localhost', 'inventory': inventory['id'], 'variables': ''})
+        self.create('job_templates', {'name': 'Demo Job Template', 'project': self.find('projects', 'Demo Project')['id'],
+                                      'inventory': inventory['id'], 'playbook': 'hello_world.yml', 'job_type': 'run',
+                                      'credential': self.find('credentials', 'Demo Credential')['id'],
+                                      # the job suites launch it with an inventory and credential of their own
+                                      'ask_inventory_on_launch': True, 'ask_credential_on_launch': True})
+        self.create('instance_groups', {'name': 'tower', 'capacity': 100})
+
+    def find(self, resource, name):
+        for record in self.objects.values():
+            if self.kinds[record['id']] == resource and record.get('name') == name:
+                return record
+        return None
+
+    def get(self, resource, object_id):
+        try:
+            object_id = int(object_id)
+        except (TypeError, ValueError):
+            raise NotFound()
+        if self.kinds.get(object_id) not in ((resource,) if resource not in UNIFIED else UNIFIED[resource]):
+            raise NotFound()
+        record = self.objects[object_id]
+        if self.kinds[object_id] in JOBS:
+            self.progress(record)
+        return record
+
+    def records(self, resource):
+        kinds = UNIFIED.get(resource, (resource,))
+        records = [record for record in self.objects.values() if self.kinds[record['id']] in kinds]
+        for record in records:
+            if self.kinds[record['id']] in JOBS:
+                self.progress(record)
+        return records
+
+    def validate(self, resource, record):
+        errors = {}
+        if resource == 'users':
+            if not record.get('username'):
+                errors['username'] = ['This field is required.']
+        elif resource not in JOBS + ('roles', 'tokens', 'workflow_job_template_nodes') and not record.get('name'):
+            errors['name'] = ['This field may not be blank.']
+        if resource == 'organizations':
+            venv = record.get('custom_virtualenv')
+            if venv and venv not in self.config()['custom_virtualenvs']:
+                errors['custom_virtualenv'] = ['{} is not a valid virtualenv in {}'.format(venv, '/var/lib/awx/venv/')]
+            try:
+                int(record.get('max_hosts') or 0)
+            except (TypeError, ValueError):
+                errors['max_hosts'] = ['A valid integer is required.']
+        for field, target in FOREIGN_KEYS.items():
+            value = record.get(field)
+            if target and value not in (None, '') and self.kinds.get(value if isinstance(value, int) else -1) != target:
+                errors[field] = ['Invalid pk "{}" - object does not exist.'.format(value)]
+        key = self.unique_key(resource, record)
+        if key is not None:
+            for other in self.records(resource):
+                if other['id'] != record.get('id') and self.unique_key(resource, other) == key:
+                    errors['__all__'] = ['{} with this Name already exists.'.format(RESOURCES[resource].replace('_', ' ').title())]
+        if errors:
+            raise BadRequest(errors)
+
+    @staticmethod
+    def unique_key(resource, record):
+        if resource == 'users':
+            return record.get('username')
+        if resource in JOBS or resource in ('roles', 'tokens', 'workflow_job_template_nodes', 'schedules'):
+            return None
+        return (record.get('name'), record.get('organization'), record.get('inventory'))
+
+    def create(self, resource, data, validate=True):
+        with self.lock:
+            record = dict(DEFAULTS.get(resource, {}))
+            record.update((field, value) for field, value in data.items() if not field.startswith('_'))
+            record.pop('id', None)
+            if validate:
+                self.validate(resource, record)
+            self.last_id += 1
+            record['id'] = self.last_id
+            record['created'] = record['modified'] = now()
+            record['_created'] = time.time()
+            self.objects[record['id']] = record
+            self.kinds[record['id']] = resource
+            for role in OBJECT_ROLES.get(resource, ()):
+                role_record = self.create('roles', {'name': role.replace('_', ' ').title(), 'role_field': role + '_role',
+                                                    'resource_id': record['id'], 'resource_type': RESOURCES[resource]},
+                                          validate=False)
+                record.setdefault('_roles', {})[role + '_role'] = role_record['id']
+            if resource == 'projects' and record.get('scm_type'):
+                self.launch('projects', record, {})
+            if resource in JOBS:
+                record.setdefault('status', 'pending')
+                record.setdefault('failed', False)
+            return record
+
+    def update(self, resource, record, data):
+        with self.lock:
+            changed = dict(record)
+            changed.update((field, value) for field, value in data.items() if not field.startswith('_') and field != 'id')
+            self.validate(resource, changed)
+            record.update(changed)
+            record['modified'] = now()
+            return record
+
+    def delete(self, resource, record):
+        with self.lock:
+            for role_id in record.get('_roles', {}).values():
+                self.objects.pop(role_id, None)
+            del self.objects[record['id']]
+            del self.kinds[record['id']]
+            for key, ids in list(self.links.items()):
+                if key[0] == record['id']:
+                    del self.links[key]
+                elif record['id'] in ids:
+                    ids.remove(record['id'])
+
+    def launch(self, resource, template, data):
+        ''' starts a job for template, returns it '''
+        jobs, field = LAUNCHES[(resource, 'launch' if resource.endswith('templates') else 'update')]
+        extra_vars = template.get('extra_vars') or {}
+        if not isinstance(extra_vars, dict):
+            try:
+                extra_vars = json.loads(extra_vars)
+            except ValueError:
+                extra_vars = {}
+        launch_vars = data.get('extra_vars') or {}
+        if not isinstance(launch_vars, dict):
+            launch_vars = json.loads(launch_vars)
+        extra_vars.update(launch_vars)
+        job = {'name': template.get('name'), field: template['id'], 'launch_type': 'manual',
+               'extra_vars': json.dumps(extra_vars), 'job_type': template.get('job_type', 'run')}
+        for copied in ('inventory', 'project', 'playbook', 'credential', 'limit', 'job_tags', 'skip_tags'):
+            if data.get(copied) not in (None, '') or template.get(copied) is not None:
+                job[copied] = data.get(copied) if data.get(copied) not in (None, '') else template.get(copied)
+        if isinstance(job.get('inventory'), str):
+            found = self.find('inventories', job['inventory'])
+            job['inventory'] = found['id'] if found else None
+        created = self.create(jobs, job, validate=False)
+        template['_last_job'] = created['id']
+        return created
+
+    def progress(self, job):
+        ''' moves a job along with the time since it was started '''
+        if job['status'] in ('successful', 'failed', 'canceled', 'error'):
+            return
+        age = time.time() - job['_created']
+        if age >= self.job_seconds:
+            job.update(status='successful', finished=now(), elapsed=round(age, 3))
+        elif age >= self.job_seconds / 5:
+            job.update(status='running', started=job.get('started') or now())
+
+    def config(self):
+        return {'version': VERSION, 'ansible_version': '2.9', 'project_base_dir': self.project_base_dir,
+                'project_local_paths': [], 'custom_virtualenvs': ['/var/lib/awx/venv/ansible/'],
+                'time_zone': 'UTC', 'license_info': {'license_type': 'open', 'valid_key': True}}
+
+    def serialize(self, resource, record):
+        ''' the record as the API shows it, with its links and the names of what it points at '''
+        kind = self.kinds[record['id']]
+        data = dict((field, value) for field, value in record.items() if not field.startswith('_'))
+        if kind == 'users':
+            data.pop('password', None)
+        base = '/api/v2/{}/{}/'.format(kind, record['id'])
+        data['type'] = RESOURCES[kind]
+        data['url'] = base
+        related = {}
+        summary = {'user_capabilities': {'edit': True, 'delete': True}}
+        for field, target in FOREIGN_KEYS.items():
+            value = record.get(field)
+            if isinstance(value, int) and value in self.objects:
+                target = target or self.kinds[value]
+                related[field] = '/api/v2/{}/{}/'.format(target, value)
+                other = self.objects[value]
+                summary[field] = {'id': value, 'name': other.get('name', other.get('username'))}
+        for parent, child in BACK_REFERENCES:
+            if parent == kind:
+                related[child] = base + child + '/'
+        if record.get('_roles'):
+            related['object_roles'] = base + 'object_roles/'
+            summary['object_roles'] = dict(
+                (field, {'id': role_id, 'name': self.objects[role_id]['name'], 'description': ''})
+                for field, role_id in record['_roles'].items())
+        if kind in ('job_templates', 'workflow_job_templates'):
+            related['launch'] = base + 'launch/'
+        if kind in ('projects', 'inventory_sources'):
+            related['update'] = base + 'update/'
+        if kind in JOBS:
+            related['cancel'] = base + 'cancel/'
+        if record.get('_last_job') in self.objects:
+            last = self.objects[record['_last_job']]
+            self.progress(last)
+            summary['last_update' if kind in ('projects', 'inventory_sources') else 'last_job'] = {
+                'id': last['id'], 'status': last['status'], 'failed': last['failed']}
+            if kind in ('projects', 'inventory_sources'):
+                data['status'] = last['status']
+                data['last_update_failed'] = last['failed']
+        elif kind == 'projects':
+            data['status'] = 'ok' if not record.get('scm_type') else 'never updated'
+        data['related'] = related
+        data['summary_fields'] = summary
+        return data
+
+    def matches(self, record, filters):
+        ''' whether record passes filters, a list of (field path, lookup, value, or group) '''
+        groups = {}
+        for path, lookup, value, or_group in filters:
+            groups.setdefault(or_group, []).append(self._match(record, path, lookup, value))
+        return all(all(results) if group is None else any(results) for group, results in groups.items())
+
+    def _match(self, record, path, lookup, value):
+        current = record
+        for field in path[:-1]:
+            target = current.get(field)
+            current = self.objects.get(target) if isinstance(target, int) else None
+            if current is None:
+                return lookup == 'isnull' and value.lower() in ('true', '1')
+        field = path[-1]
+        actual = current.get(field)
+        if lookup == 'isnull':
+            return (actual is None) == (value.lower() in ('true', '1'))
+        if isinstance(actual, bool):
+            actual = 'true' if actual else 'false'
+            value = value.lower()
+        elif actual is None:
+            actual = ''
+        actual = '{}'.format(actual)
+        if lookup == 'in':
+            return actual in value.split(',')
+        if lookup.startswith('i'):
+            actual, value, lookup = actual.lower(), value.lower(), lookup[1:]
+        if lookup == 'contains':
+            return value in actual
+        if lookup == 'startswith':
+            return actual.startswith(value)
+        return actual == value
+
+
+def parse_filters(query):
+    ''' (field path, lookup, value, or group) for each filtering query parameter '''
+    filters = []
+    for key, value in query:
+        if key in ('page', 'page_size', 'order_by', 'search', 'format'):
+            continue
+        or_group = None
+        if key.startswith('or__'):
+            key, or_group = key[4:], 'or'
+        elif key.startswith('not__'):
+            continue
+        path = key.split('__')
+        lookup = path.pop() if len(path) > 1 and path[-1] in LOOKUPS else 'exact'
+        filters.append((path, lookup, value, or_group))
+    return filters
+
+
+class MockAWXHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'mock_awx/' + VERSION
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def do_GET(self):
+        self.handle_api('GET')
+
+    def do_POST(self):
+        self.handle_api('POST')
+
+    def do_PATCH(self):
+        self.handle_api('PATCH')
+
+    def do_PUT(self):
+        self.handle_api('PUT')
+
+    def do_DELETE(self):
+        self.handle_api('DELETE')
+
+    def do_OPTIONS(self):
+        self.handle_api('OPTIONS')
+
+    def send_json(self, status, data=None):
+        body = b'' if data is None else json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-API-Product-Name', 'AWX')
+        self.send_header('X-API-Product-Version', VERSION)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self):
+        if self.server.credentials is None:
+            return True
+        header = self.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            token = header[7:]
+            return any(record.get('token') == token for record in self.server.store.records('tokens'))
+        if header.startswith('Basic '):
+            try:
+                username, _, password = base64.b64decode(header[6:]).decode('utf-8').partition(':')
+            except (binascii.Error, UnicodeDecodeError):
+                return False
+            return (username, password) == self.server.credentials
+        return False
+
+    def handle_api(self, method):
+        started = time.time()
+        split = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            data = json.loads(body.decode('utf-8')) if body else {}
+        except ValueError:
+            data = ValueError
+        try:
+            if data is ValueError:
+                raise BadRequest({'detail': 'JSON parse error.'})
+            if not isinstance(data, dict):
+                # every endpoint takes an object, a list or a string body would fail deep in the route
+                raise BadRequest({'detail': 'Invalid data. Expected a dictionary, but got {}.'.format(type(data).__name__)})
+            if split.path.rstrip('/') != '/api' and not self.authorized():
+                status, result = 401, {'detail': 'Authentication credentials were not provided.'}
+            else:
+                with self.server.store.lock:
+                    status, result = self.route(method, split.path, parse_qsl(split.query), data)
+        except NotFound:
+            status, result = 404, {'detail': 'Not found.'}
+        except BadRequest as e:
+            status, result = 400, e.errors
+        self.send_json(status, result)
+        endpoint = '{} {}'.format(method, ID_IN_PATH.sub('/<id>/', split.path))
+        with self.server.stats_lock:
+            self.server.requests[endpoint] += 1
+            self.server.seconds[endpoint] += time.time() - started
+
+    def route(self, method, path, query, data):
+        store = self.server.store
+        parts = [part for part in path.split('/') if part]
+        if parts == ['api']:
+            return 200, {'description': 'AWX REST API', 'current_version': '/api/v2/',
+                         'available_versions': {'v2': '/api/v2/'}}
+        if parts[:2] != ['api', 'v2']:
+            raise NotFound()
+        parts = parts[2:]
+        if not parts:
+            return 200, OrderedDict((name, '/api/v2/{}/'.format(name)) for name in list(RESOURCES) + ['ping', 'config', 'me', 'settings'])
+        if parts == ['ping']:
+            return 200, {'version': VERSION, 'ha': False, 'active_node': 'awx',
+                         'instances': [{'node': 'awx', 'capacity': 100, 'version': VERSION}]}
+        if parts == ['config']:
+            return 200, store.config()
+        if parts == ['me']:
+            return 200, self.page('users', [record for record in store.records('users')
+                                            if record.get('username') == 'admin'], query)
+        if parts[0] == 'settings':
+            return self.route_settings(method, parts[1:], data)
+
+        resource = parts[0]
+        if resource not in RESOURCES and resource not in UNIFIED:
+            raise NotFound()
+        if len(parts) == 1:
+            return self.route_list(method, resource, query, data)
+        record = store.get(resource, parts[1])
+        resource = store.kinds[record['id']]
+        if len(parts) == 2:
+            return self.route_detail(method, resource, record, data)
+        if len(parts) == 3:
+            return self.route_related(method, resource, record, parts[2], query, data)
+        raise NotFound()
+
+    def page(self, resource, records, query):
+        params = dict(query)
+        try:
+            page = max(int(params.get('page', 1)), 1)
+            page_size = min(max(int(params.get('page_size', 25)), 1), 200)
+        except ValueError:
+            raise BadRequest({'detail': 'Invalid page.'})
+        order_by = params.get('order_by')
+        if order_by:
+            field = order_by.lstrip('-')
+            records = sorted(records, key=lambda record: '{}'.format(record.get(field, '')),
+                             reverse=order_by.startswith('-'))
+        start = (page - 1) * page_size
+        results = records[start:start + page_size]
+
+        def link(number):
+            return '?' + urlencode(list((key, value) for key, value in query if key != 'page') + [('page', number)])
+        return {'count': len(records),
+                'next': link(page + 1) if start + page_size < len(records) else None,
+                'previous': link(page - 1) if page > 1 else None,
+                'results': [self.server.store.serialize(resource, record) for record in results]}
+
+    def route_list(self, method, resource, query, data):
+        store = self.server.store
+        if method == 'GET':
+            filters = parse_filters(query)
+            return 200, self.page(resource, [record for record in store.records(resource)
+                                             if store.matches(record, filters)], query)
+        if method == 'OPTIONS':
+            return 200, {'name': resource, 'actions': {'GET': {}, 'POST': {}}}
+        if method == 'POST' and resource not in UNIFIED:
+            if resource == 'tokens':
+                data = dict(data, token=binascii.hexlify(os.urandom(15)).decode())
+            return 201, store.serialize(resource, store.create(resource, data))
+        return 405, {'detail': 'Method "{}" not allowed.'.format(method)}
+
+    def route_detail(self, method, resource, record, data):
+        store = self.server.store
+        if method == 'GET':
+            return 200, store.serialize(resource, record)
+        if method in ('PATCH', 'PUT'):
+            return 200, store.serialize(resource, store.update(resource, record, data))
+        if method == 'DELETE':
+            store.delete(resource, record)
+            return 204, None
+        return 405, {'detail': 'Method "{}" not allowed.'.format(method)}
+
+    def route_related(self, method, resource, record, related, query, data):
+        store = self.server.store
+        if (resource, related) in LAUNCHES:
+            if method == 'GET':
+                return 200, {'can_start_without_user_input': True, 'can_update': True, 'can_cancel': True,
+                             'ask_inventory_on_launch': bool(record.get('ask_inventory_on_launch')),
+                             'ask_credential_on_launch': bool(record.get('ask_credential_on_launch')),
+                             'ask_variables_on_launch': bool(record.get('ask_variables_on_launch')),
+                             'variables_needed_to_start': [], 'passwords_needed_to_start': [],
+                             'credential_needed_to_start': False, 'inventory_needed_to_start': False,
+                             'defaults': {'extra_vars': record.get('extra_vars') or ''},
+                             'job_template_data': {'id': record['id'], 'name': record.get('name'), 'description': ''}}
+            if method == 'POST':
+                job = store.launch(resource, record, data)
+                jobs = store.kinds[job['id']]
+                result = store.serialize(jobs, job)
+                result[RESOURCES[jobs]] = job['id']
+                result['ignored_fields'] = {}
+                return 201 if resource.endswith('templates') else 202, result
+        if resource in JOBS and related == 'cancel':
+            if method == 'GET':
+                return 200, {'can_cancel': record['status'] in ('pending', 'waiting', 'running')}
+            if method == 'POST':
+                if record['status'] not in ('pending', 'waiting', 'running'):
+                    return 405, {'error': 'Job cannot be canceled.'}
+                record.update(status='canceled', failed=True, finished=now())
+                return 202, None
+        if resource in JOBS and related in ('stdout', 'job_events'):
+            if related == 'stdout':
+                return 200, {'content': 'mock_awx ran {}\n'.format(record.get('name')), 'range': {'start': 0, 'end': 1}}
+            return 200, self.page('jobs', [], query)
+        if related == 'object_roles' and record.get('_roles'):
+            return 200, self.page('roles', [store.objects[role_id] for role_id in record['_roles'].values()], query)
+        if related == 'survey_spec' and resource in ('job_templates', 'workflow_job_templates'):
+            if method == 'GET':
+                return 200, record.get('_survey_spec', {})
+            if method == 'POST':
+                record['_survey_spec'] = data
+                return 200, None
+            if method == 'DELETE':
+                record.pop('_survey_spec', None)
+                return 200, None
+        if (resource, related) in BACK_REFERENCES:
+            field = BACK_REFERENCES[(resource, related)]
+            target = related if related != 'workflow_nodes' else 'workflow_job_template_nodes'
+            if method == 'POST' and 'id' not in data:
+                return 201, store.serialize(target, store.create(target, dict(data, **{field: record['id']})))
+            if method == 'GET':
+                filters = parse_filters(query)
+                return 200, self.page(target, [other for other in store.records(target)
+                                               if other.get(field) == record['id'] and store.matches(other, filters)], query)
+        if related in ASSOCIATIONS:
+            target = ASSOCIATIONS[related]
+            ids = store.links.setdefault((record['id'], related), [])
+            if method == 'GET':
+                filters = parse_filters(query)
+                return 200, self.page(target, [store.objects[other_id] for other_id in ids
+                                               if store.matches(store.objects[other_id], filters)], query)
+            if method == 'POST':
+                if 'id' not in data:
+                    other = store.create(target, data)
+                    ids.append(other['id'])
+                    return 201, store.serialize(target, other)
+                other = store.get(target, data['id'])
+                if data.get('disassociate'):
+                    if other['id'] in ids:
+                        ids.remove(other['id'])
+                elif other['id'] not in ids:
+                    ids.append(other['id'])
+                return 204, None
+        raise NotFound()
+
+    def route_settings(self, method, parts, data):
+        store = self.server.store
+        if not parts:
+            return 200, self.page('settings', [], [])
+        if len(parts) != 1:
+            raise NotFound()
+        if method == 'GET':
+            return 200, store.settings
+        if method in ('PATCH', 'PUT'):
+            errors = dict((name, ['Expected a list of items but got type "{}".'.format(type(value).__name__)])
+                          for name, value in data.items() if name in LIST_SETTINGS and not isinstance(value, list))
+            if errors:
+                raise BadRequest(errors)
+            store.settings.update(data)
+            return 200, store.settings
+        if method == 'DELETE':
+            store.settings = copy.deepcopy(SETTINGS)
+            return 204, None
+        return 405, {'detail': 'Method "{}" not allowed.'.format(method)}
+
+
+class MockAWX(ThreadingHTTPServer):
+    ''' a mock AWX with a store of its own, serving from a daemon thread once started '''
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, credentials=('admin', 'password'), job_seconds=1.0,
+                 project_base_dir='/var/lib/awx/projects', verbose=False):
+        ThreadingHTTPServer.__init__(self, (host, port), MockAWXHandler)
+        self.store = Store(job_seconds, project_base_dir)
+        self.credentials = credentials
+        self.verbose = verbose
+        self.stats_lock = threading.Lock()
+        self.requests = Counter()
+        self.seconds = Counter()
+        self.connections = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server_address[:2])
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='mock_awx-{}'.format(self.server_address[1]))
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = ArgumentParser(description='Serve an in-memory mock of the AWX API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8013)
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--job-seconds', type=float, default=1.0, help='how long each job takes to finish')
+    parser.add_argument('--project-base-dir', default='/var/lib/awx/projects')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    server = MockAWX(args.host, args.port, (args.username, args.password), args.job_seconds,
+                     args.project_base_dir, args.verbose)
+    print('TOWER_HOST={} TOWER_USERNAME={} TOWER_PASSWORD={}'.format(server.url, args.username, args.password))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print('{} requests over {} connections'.format(sum(server.requests.values()), server.connections))
+    for endpoint, count in server.requests.most_common():
+        print('{:>7} {}'.format(count, endpoint))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+What the benchmarks share: writing a local-connection inventory of generated
+hosts, and running ansible-playbook from the repo with its output in a log,
+timed, with the controller's peak RSS.
+"""
+import os
+import subprocess
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_inventory(directory, num_hosts, prefix='bench_host_', digits=5, hosts=None):
+    ''' writes hosts.ini under directory, returns its path
+
+    The hosts are a range of num_hosts names starting with prefix, or the names in hosts if given.
+    '''
+    path = os.path.join(directory, 'hosts.ini')
+    with open(path, 'w') as f:
+        if hosts is None:
+            f.write('{0}[{1:0{3}d}:{2:0{3}d}]\n'.format(prefix, 1, num_hosts, digits))
+        else:
+            f.writelines('{}\n'.format(host) for host in hosts)
+        f.write('\n[all:vars]\nansible_connection=local\nansible_python_interpreter={}\n'.format(sys.executable))
+    return path
+
+
+def run_playbook(cmd, log, env=None):
+    ''' runs cmd from the repo with its output in log, returns its exit code, wall time and peak RSS in KiB '''
+    with open(log, 'w') as out:
+        start = time.time()
+        proc = subprocess.Popen(cmd, cwd=REPO, env=env, stdin=subprocess.DEVNULL, stdout=out, stderr=out)
+        # wait4 gives the rusage of this run alone; ru_maxrss is the controller's peak
+        _, status, rusage = os.wait4(proc.pid, 0)
+        elapsed = time.time() - start
+    return os.waitstatus_to_exitcode(status), elapsed, rusage.ru_maxrss
+
+
+def log_tail(log, lines=10):
+    with open(log) as f:
+        return f.readlines()[-lines:]
+
+
+def fail(log, message):
+    ''' exits with message, after writing the end of the run's log to stderr '''
+    sys.stderr.write(''.join(log_tail(log, 30)))
+    raise SystemExit(message)
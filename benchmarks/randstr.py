@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Strings/sec of the randstr lookup in tower_modules/lookup_plugins, at 1, 1k and
+1M names, for the original one string per call and the count and unique options.
+
+    benchmarks/randstr.py --counts 1 1000 1000000
+"""
+from argparse import ArgumentParser
+import os
+import random
+import string
+import time
+
+from ansible.plugins.loader import lookup_loader
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy(count):
+    ''' what randstr did before count: one call, and one random.choice per character, per string '''
+    return [[''.join(random.choice(string.ascii_lowercase) for i in range(12))][0] for n in range(count)]
+
+
+def per_call(lookup, count, **options):
+    ''' count lookups of one string each, the way the tower module tests mint names '''
+    return [lookup.run([], variables={}, **options)[0] for n in range(count)]
+
+
+def main():
+    parser = ArgumentParser(description='Measure strings/sec of the randstr lookup.')
+    parser.add_argument('--counts', type=int, nargs='+', default=[1, 1000, 1000000])
+    args = parser.parse_args()
+
+    lookup_loader.add_directory(os.path.join(REPO, 'tower_modules', 'lookup_plugins'))
+    lookup = lookup_loader.get('randstr')
+
+    variants = [
+        ('legacy', legacy),
+        ('one per call', lambda count: per_call(lookup, count)),
+        ('count', lambda count: lookup.run([], variables={}, count=count)),
+        ('count unique', lambda count: lookup.run([], variables={}, count=count, unique=True)),
+    ]
+    print('{:<14} {:>9} {:>10} {:>14}'.format('variant', 'names', 'time', 'strings/sec'))
+    for count in args.counts:
+        for name, generate in variants:
+            start = time.time()
+            names = generate(count)
+            elapsed = time.time() - start
+            assert len(names) == count
+            print('{:<14} {:>9} {:>9.4f}s {:>14.0f}'.format(name, count, elapsed, count / elapsed if elapsed else 0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""
+Runs the repo's performance-shaped playbooks over a matrix of forks, strategies,
+host counts and num_messages against a local-connection inventory, and records
+wall-clock time, per-task latency and controller peak RSS.
+
+    benchmarks/run_playbooks.py --hosts 10 50 --forks 5 50 --output results.json --csv results.csv
+    benchmarks/run_playbooks.py --baseline results.json --threshold 0.15
+
+Exits non-zero if any run failed, or regressed against the baseline by more than the
+threshold. Failed runs, in either, are not compared, since their times say nothing.
+"""
+from argparse import ArgumentParser
+from collections import OrderedDict
+from xml.etree import ElementTree
+import csv
+import glob
+import itertools
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+from playbook_run import REPO, log_tail, run_playbook, write_inventory
+
+PLAYBOOKS = ['file_benchmark.yml', 'file_benchmark_bulk.yml', 'setfact_50.yml', 'debug-50.yml',
+             'chatty_tasks.yml', 'ping-20.yml', 'serial.yml', 'free_waiter.yml']
+
+# only these playbooks read num_messages, so the rest are not repeated for each value
+USES_NUM_MESSAGES = ['chatty_tasks.yml']
+
+KEY_FIELDS = ['playbook', 'forks', 'strategy', 'hosts', 'num_messages']
+
+TESTCASE_NAME = re.compile(r'^\[(?P<host>[^\]]+)\] (?P<task>.*)$')
+
+PLAY_STRATEGY = re.compile(r'^(\s*)strategy:.*$', re.MULTILINE)
+
+# lets a copy of a playbook outside the repo still find the repo's plugins
+ADJACENT_PLUGINS = {'ANSIBLE_LIBRARY': 'library',
+                    'ANSIBLE_ACTION_PLUGINS': 'action_plugins',
+                    'ANSIBLE_CALLBACK_PLUGINS': 'callback_plugins',
+                    'ANSIBLE_STRATEGY_PLUGINS': 'strategy_plugins'}
+
+
+def task_latencies(junit_dir):
+    ''' per-task count, mean and max duration across hosts, from the junit callback's report '''
+    durations = OrderedDict()
+    for report in glob.glob(os.path.join(junit_dir, '*.xml')):
+        for testcase in ElementTree.parse(report).iter('testcase'):
+            match = TESTCASE_NAME.match(testcase.get('name', ''))
+            task = match.group('task') if match else testcase.get('name')
+            # unnamed tasks share a name, so the task path and line keep them apart
+            task = '{} {}'.format(os.path.relpath(testcase.get('classname', ''), REPO), task)
+            durations.setdefault(task, []).append(float(testcase.get('time') or 0))
+    return OrderedDict((task, {'count': len(times),
+                               'mean': sum(times) / len(times),
+                               'max': max(times)})
+                       for task, times in durations.items())
+
+
+def force_strategy(playbook, strategy, workdir):
+    ''' copy of the playbook with every play's own strategy keyword replaced '''
+    with open(os.path.join(REPO, playbook)) as f:
+        content = PLAY_STRATEGY.sub(r'\1strategy: {}'.format(strategy), f.read())
+    path = os.path.join(workdir, playbook)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+def run_one(playbook, forks, strategy, num_hosts, num_messages, workdir, override_play_strategy=False):
+    inventory = write_inventory(workdir, num_hosts)
+    junit_dir = tempfile.mkdtemp(dir=workdir)
+    env = dict(os.environ,
+               ANSIBLE_STRATEGY=strategy,
+               ANSIBLE_CALLBACKS_ENABLED='junit',
+               JUNIT_OUTPUT_DIR=junit_dir,
+               JUNIT_HIDE_TASK_ARGUMENTS='true',
+               ANSIBLE_HOST_KEY_CHECKING='false')
+    playbook_path = os.path.join(REPO, playbook)
+    if override_play_strategy:
+        playbook_path = force_strategy(playbook, strategy, workdir)
+        env.update((name, os.path.join(REPO, subdir)) for name, subdir in ADJACENT_PLUGINS.items())
+    cmd = ['ansible-playbook', '-i', inventory, '-f', str(forks), playbook_path]
+    if num_messages is not None:
+        cmd += ['-e', 'num_messages={}'.format(num_messages)]
+
+    log = os.path.join(workdir, 'ansible.log')
+    rc, elapsed, peak_rss_kb = run_playbook(cmd, log, env)
+
+    result = OrderedDict([('playbook', playbook), ('forks', forks), ('strategy', strategy),
+                          ('hosts', num_hosts), ('num_messages', num_messages),
+                          ('rc', rc), ('wall_time', round(elapsed, 3)),
+                          ('peak_rss_kb', peak_rss_kb)])
+    result['failed'] = rc != 0
+    result['tasks'] = task_latencies(junit_dir)
+    shutil.rmtree(junit_dir)
+    if result['failed']:
+        result['log_tail'] = log_tail(log)
+    return result
+
+
+def run_key(result):
+    return tuple(result[field] for field in KEY_FIELDS)
+
+
+def failed(result):
+    # baselines written before failed was recorded only have rc
+    return result.get('failed', result['rc'] != 0)
+
+
+def find_regressions(results, baseline, threshold):
+    ''' regressions of the runs that succeeded both now and in the baseline, and the runs skipped for failing '''
+    baseline = dict((run_key(result), result) for result in baseline)
+    regressions = []
+    skipped = []
+    for result in results:
+        before = baseline.get(run_key(result))
+        if not before:
+            continue
+        if failed(result) or failed(before):
+            skipped.append(result)
+            continue
+        for metric in ('wall_time', 'peak_rss_kb'):
+            if before[metric] and result[metric] > before[metric] * (1 + threshold):
+                regressions.append((result, metric, before[metric], result[metric]))
+    return regressions, skipped
+
+
+def write_csv(results, path):
+    fields = KEY_FIELDS + ['rc', 'failed', 'wall_time', 'peak_rss_kb', 'task', 'task_count', 'task_mean', 'task_max']
+    with open(path, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for result in results:
+            row = [result[field] for field in fields[:len(KEY_FIELDS) + 4]]
+            for task, latency in result['tasks'].items() or [('', {})]:
+                writer.writerow(row + [task, latency.get('count'), latency.get('mean'), latency.get('max')])
+
+
+def parse_args():
+    parser = ArgumentParser(description='Benchmark the repo playbooks against local-connection hosts.')
+    parser.add_argument('--playbooks', nargs='+', default=PLAYBOOKS)
+    parser.add_argument('--forks', nargs='+', type=int, default=[5])
+    parser.add_argument('--strategies', nargs='+', default=['linear'],
+                        help='e.g. linear, free, or local_threads and local_threads_free from strategy_plugins/')
+    parser.add_argument('--override-play-strategy', action='store_true',
+                        help='Also replace strategies set by the plays themselves, e.g. in free_waiter.yml')
+    parser.add_argument('--hosts', nargs='+', type=int, default=[10])
+    parser.add_argument('--num-messages', nargs='+', type=int, default=[50])
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--csv', help='Write per-task results as CSV to this file')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown or RSS growth that counts as a regression (default: 0.1)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = []
+    workdir = tempfile.mkdtemp(prefix='run_playbooks.')
+    try:
+        for playbook, forks, strategy, num_hosts in itertools.product(args.playbooks, args.forks,
+                                                                      args.strategies, args.hosts):
+            for num_messages in (args.num_messages if playbook in USES_NUM_MESSAGES else [None]):
+                result = run_one(playbook, forks, strategy, num_hosts, num_messages, workdir,
+                                 args.override_play_strategy)
+                print('{playbook} forks={forks} strategy={strategy} hosts={hosts} num_messages={num_messages}: '
+                      'rc={rc} {wall_time}s {peak_rss_kb}KB{status}'.format(
+                          status=' FAILED' if result['failed'] else '', **result))
+                if result['failed']:
+                    sys.stderr.write(''.join(result['log_tail']))
+                results.append(result)
+    finally:
+        shutil.rmtree(workdir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.csv:
+        write_csv(results, args.csv)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions, skipped = find_regressions(results, json.load(f), args.threshold)
+        for result, metric, before, after in regressions:
+            print('REGRESSION {} {}: {} -> {} (+{:.0%})'.format(
+                ' '.join('{}={}'.format(field, result[field]) for field in KEY_FIELDS),
+                metric, before, after, float(after) / before - 1))
+        for result in skipped:
+            print('NOT COMPARED {}: failed now or in the baseline'.format(
+                ' '.join('{}={}'.format(field, result[field]) for field in KEY_FIELDS)))
+    failures = [result for result in results if result['failed']]
+    for result in failures:
+        print('FAILED {}: rc={}'.format(' '.join('{}={}'.format(field, result[field]) for field in KEY_FIELDS),
+                                        result['rc']))
+    if regressions or failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Runs scan_custom_scale.yml over a matrix of host counts and payload sizes and
+reports how the controller copes with large fact payloads: wall time, peak RSS,
+and both divided by the megabytes of facts returned.
+
+    benchmarks/scan_facts_throughput.py --hosts 1 10 50 --payload-kb 256 1024 4096
+"""
+from argparse import ArgumentParser
+import os
+import shutil
+import tempfile
+
+from playbook_run import REPO, fail, run_playbook, write_inventory
+
+
+def run(inventory, payload_kb, args, workdir):
+    ''' runs scan_custom_scale.yml once, returns the wall time and the controller's peak RSS in KiB '''
+    cmd = ['ansible-playbook', '-i', inventory, '-f', str(args.forks),
+           '-e', 'payload_kb={} depth={} list_length={} unicode_ratio={}'.format(
+               payload_kb, args.depth, args.list_length, args.unicode_ratio),
+           os.path.join(REPO, 'scan_custom_scale.yml')]
+    log = os.path.join(workdir, 'stdout')
+    rc, elapsed, peak_rss_kb = run_playbook(cmd, log)
+    if rc:
+        fail(log, 'run with {} KiB payloads failed with rc {}'.format(payload_kb, rc))
+    return elapsed, peak_rss_kb
+
+
+def parse_args():
+    parser = ArgumentParser(description='Measure controller time and memory for large fact payloads.')
+    parser.add_argument('--hosts', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--payload-kb', type=int, nargs='+', default=[256, 1024, 4096])
+    parser.add_argument('--forks', type=int, default=5)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--list-length', type=int, default=10)
+    parser.add_argument('--unicode-ratio', type=float, default=0.1)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='scan_facts_throughput.')
+    try:
+        print('{:>6} {:>10} {:>10} {:>9} {:>12} {:>9} {:>12}'.format(
+            'hosts', 'payload', 'facts MB', 'time', 'peak RSS MB', 's/MB', 'RSS MB/MB'))
+        for num_hosts in args.hosts:
+            inventory = write_inventory(workdir, num_hosts)
+            for payload_kb in args.payload_kb:
+                elapsed, peak_rss = run(inventory, payload_kb, args, workdir)
+                facts_mb = num_hosts * payload_kb / 1024.0
+                print('{:>6} {:>8}KB {:>10.1f} {:>8.2f}s {:>12.1f} {:>9.3f} {:>12.2f}'.format(
+                    num_hosts, payload_kb, facts_mb, elapsed, peak_rss / 1024.0,
+                    elapsed / facts_mb, peak_rss / 1024.0 / facts_mb))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
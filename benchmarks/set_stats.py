@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Times merging the aggregated run stats of test_set_stats_scale.yml the way
+set_stats and stream_stats do, for --merge-hosts hosts, in this process. Then
+runs the playbook with set_stats and with stream_stats over a sweep of host
+counts, and reports the time of each and the controller's RSS when the stats
+are sent, from the memory_profile callback. Peak RSS is not comparable,
+as it is reached by the forked workers as often as by the controller.
+
+Both runs enable the stream_stats callback from callback_plugins/ to write the
+artifact, with the set_stats run writing ansible's own custom stats through
+include_set_stats, so the two artifacts are compared as well.
+
+The merge is timed on its own because task execution dominates the runs, and
+hides it below a few thousand hosts.
+
+    benchmarks/set_stats.py --merge-hosts 1000 5000 20000 --hosts 250 1000 --payload-items 100
+"""
+from argparse import ArgumentParser
+from copy import deepcopy
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from ansible.executor.stats import AggregateStats
+
+from playbook_run import REPO, fail, run_playbook, write_inventory
+
+ACTIONS = ['set_stats', 'stream_stats']
+
+# set_stats_data of test_set_stats_scale.yml
+STATS_DATA = {
+    'string': 'abc', 'integer': 123, 'float': 1.0, 'unicode': u'竳䙭韽', 'boolean': True, 'none': None,
+    'list': ['abc', 123, 1.0, u'竳䙭韽', True, None, [], {}],
+    'object': {'string': 'abc', 'integer': 123, 'float': 1.0, 'unicode': u'竳䙭韽', 'boolean': True,
+               'none': None, 'list': [], 'object': {}},
+}
+
+
+def load_callback():
+    path = os.path.join(REPO, 'callback_plugins', 'stream_stats.py')
+    spec = importlib.util.spec_from_file_location('stream_stats_callback', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.CallbackModule
+
+
+def time_merges(callback_class, num_hosts, payload_items):
+    ''' seconds to merge num_hosts hosts' run_payload into the run stats with set_stats and with stream_stats '''
+    def run_payloads():
+        # set_stats extends the first host's hosts list in place, so each merge gets payloads of its own
+        payloads = []
+        for num in range(1, num_hosts + 1):
+            host = 'host{:06d}'.format(num)
+            payloads.append({'hosts': [host], 'host_count': 1,
+                             'by_host': {host: {'items': payload_items, 'data': deepcopy(STATS_DATA)}}})
+        return payloads
+
+    # what the strategy does with each result's ansible_stats
+    payloads = run_payloads()
+    stats = AggregateStats()
+    start = time.time()
+    for payload in payloads:
+        for key, value in payload.items():
+            stats.update_custom_stats(key, value)
+    set_stats_time = time.time() - start
+
+    payloads = run_payloads()
+    callback = callback_class()
+    start = time.time()
+    for payload in payloads:
+        callback._apply(None, {'data': payload, 'aggregate': True})
+    stream_stats_time = time.time() - start
+
+    return set_stats_time, stream_stats_time, stats.custom['_run'] == callback._run
+
+
+def run(inventory, action, args, workdir):
+    ''' runs test_set_stats_scale.yml once, returns its time, RSS in KB at the play start and stats and artifact '''
+    artifact = os.path.join(workdir, '{}.json'.format(action))
+    report = os.path.join(workdir, 'memory_profile.json')
+    # memory_profile is listed first so its stats sample is taken before stream_stats writes the artifact
+    env = dict(os.environ, ANSIBLE_CALLBACKS_ENABLED='memory_profile,stream_stats',
+               ANSIBLE_CALLBACK_PLUGINS=os.path.join(REPO, 'callback_plugins'),
+               ANSIBLE_ACTION_PLUGINS=os.path.join(REPO, 'action_plugins'),
+               MEMORY_PROFILE_OUTPUT_FILE=report, MEMORY_PROFILE_TRACE='False', MEMORY_PROFILE_SAMPLES='play,stats',
+               STREAM_STATS_OUTPUT_FILE=artifact, STREAM_STATS_SPILL_DIR=workdir,
+               STREAM_STATS_INCLUDE_SET_STATS=str(action == 'set_stats'))
+    cmd = ['ansible-playbook', '-i', inventory, '-f', str(args.forks), os.path.join(REPO, 'test_set_stats_scale.yml'),
+           '-e', 'stats_action={} payload_items={}'.format(action, args.payload_items)]
+    log = os.path.join(workdir, 'stdout')
+    rc, elapsed, _ = run_playbook(cmd, log, env)
+    if rc or not os.path.exists(artifact) or not os.path.exists(report):
+        fail(log, '{} run failed with rc {}'.format(action, rc))
+    with open(report) as f:
+        samples = json.load(f)['samples']
+    os.remove(report)
+    return elapsed, samples[0]['rss_kb'], samples[-1]['rss_kb'], artifact
+
+
+def main():
+    parser = ArgumentParser(description='Compare set_stats and stream_stats on test_set_stats_scale.yml.')
+    parser.add_argument('--merge-hosts', type=int, nargs='+', default=[1000, 5000, 20000],
+                        help='host counts to time the run stats merge alone for')
+    parser.add_argument('--hosts', type=int, nargs='+', default=[250, 1000])
+    parser.add_argument('--payload-items', type=int, default=50, help='nested items in each host\'s payload')
+    parser.add_argument('--forks', type=int, default=10)
+    args = parser.parse_args()
+
+    failed = False
+    callback_class = load_callback()
+    print('{:>7} {:>15} {:>18}'.format('hosts', 'set_stats merge', 'stream_stats merge'))
+    for num_hosts in sorted(args.merge_hosts):
+        set_stats_time, stream_stats_time, same = time_merges(callback_class, num_hosts, args.payload_items)
+        failed = failed or not same
+        print('{:>7} {:>14.2f}s {:>17.2f}s  {}'.format(
+            num_hosts, set_stats_time, stream_stats_time, 'same' if same else 'DIFFERENT'))
+    print('')
+
+    workdir = tempfile.mkdtemp(prefix='set_stats.')
+    try:
+        print('{:>7} {:<13} {:>9} {:>14} {:>13} {:>12}  {}'.format(
+            'hosts', 'action', 'time', 'start RSS MB', 'stats RSS MB', 'artifact MB', 'artifact'))
+        for num_hosts in sorted(args.hosts):
+            inventory = write_inventory(workdir, num_hosts, prefix='host', digits=6)
+            artifacts = []
+            for action in ACTIONS:
+                elapsed, start_rss_kb, stats_rss_kb, artifact = run(inventory, action, args, workdir)
+                artifacts.append(artifact)
+                same = ''
+                if len(artifacts) == 2:
+                    with open(artifacts[0]) as first, open(artifacts[1]) as second:
+                        same = 'same' if json.load(first) == json.load(second) else 'DIFFERENT'
+                    failed = failed or same != 'same'
+                print('{:>7} {:<13} {:>8.2f}s {:>14.1f} {:>13.1f} {:>12.1f}  {}'.format(
+                    num_hosts, action, elapsed, start_rss_kb / 1024.0, stats_rss_kb / 1024.0,
+                    os.path.getsize(artifact) / 1024.0 / 1024.0, same))
+    finally:
+        shutil.rmtree(workdir)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Measures what this repo's plugin directories add to ansible-playbook startup.
+
+First each plugin file is imported on its own, in a fresh interpreter that has
+already imported what ansible-playbook and the plugin base classes import, and
+the import time is reported with the heaviest modules it pulled in that were
+not loaded yet.
+
+Then ansible-playbook --syntax-check and a run of ping.yml against localhost
+are timed from a copy of ping.yml outside the repo, so no adjacent plugin
+directory is picked up, with no plugin path, with each plugin path on its own
+and with all of them. Times are the median of --repeat runs.
+
+    benchmarks/startup.py --repeat 5
+"""
+from argparse import ArgumentParser
+from collections import OrderedDict
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# plugin directories, and the setting that adds them to the plugin path
+PLUGIN_PATHS = OrderedDict([
+    ('library', 'ANSIBLE_LIBRARY'),
+    ('action_plugins', 'ANSIBLE_ACTION_PLUGINS'),
+    ('become_plugins', 'ANSIBLE_BECOME_PLUGINS'),
+    ('cache_plugins', 'ANSIBLE_CACHE_PLUGINS'),
+    ('callback_plugins', 'ANSIBLE_CALLBACK_PLUGINS'),
+    ('strategy_plugins', 'ANSIBLE_STRATEGY_PLUGINS'),
+    ('vars_plugins', 'ANSIBLE_VARS_PLUGINS'),
+    ('tower_modules/lookup_plugins', 'ANSIBLE_LOOKUP_PLUGINS'),
+    ('inventories/user_plugins/inventory_plugins', 'ANSIBLE_INVENTORY_PLUGINS'),
+])
+
+# what ansible-playbook has imported by the time it loads plugins of each type
+IMPORT_BASELINE = '''
+import sys, time, json, importlib.util
+import ansible.cli.playbook, ansible.executor.playbook_executor
+from ansible.plugins.loader import init_plugin_loader
+init_plugin_loader()
+import ansible.plugins.action, ansible.plugins.become, ansible.plugins.cache, ansible.plugins.callback
+import ansible.plugins.inventory, ansible.plugins.lookup, ansible.plugins.strategy.linear, ansible.plugins.vars
+import ansible.module_utils.basic
+before = set(sys.modules)
+sys.stderr.write('-- plugin --\\n')
+sys.stderr.flush()
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location('startup_plugin', sys.argv[1])
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+elapsed = time.perf_counter() - start
+print(json.dumps({'ms': elapsed * 1000, 'new': sorted(set(sys.modules) - before)}))
+'''
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+def import_plugin(directory, path):
+    ''' import time in ms and the new top level modules with their cumulative import time in ms '''
+    # plugins that load their siblings through the plugin loader need their own path configured
+    env = dict(os.environ, **{PLUGIN_PATHS[directory]: os.path.join(REPO, directory)})
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_BASELINE, path],
+                          env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True)
+    if proc.returncode:
+        raise SystemExit('importing {} failed:\n{}'.format(path, proc.stderr[-2000:]))
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    heaviest = {}
+    # importtime lines: "import time: self [us] | cumulative | imported package", nested imports indented
+    for line in proc.stderr.split('-- plugin --\n', 1)[-1].splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if name.strip() in result['new'] and name[:3] == '   ' and name[3] != ' ':
+            heaviest[name.strip()] = int(cumulative) / 1000.0
+    return result['ms'], sorted(heaviest.items(), key=lambda item: item[1], reverse=True)
+
+
+def run_playbook(workdir, plugin_paths, args, syntax_check):
+    env = dict(os.environ, ANSIBLE_CONFIG=os.path.join(REPO, 'ansible.cfg'))
+    for path in plugin_paths:
+        env[PLUGIN_PATHS[path]] = os.path.join(REPO, path)
+    cmd = ['ansible-playbook', '-i', 'localhost,', '-c', 'local', os.path.join(workdir, 'ping.yml')]
+    if syntax_check:
+        cmd.append('--syntax-check')
+    times = []
+    for _ in range(args.repeat):
+        with open(os.path.join(workdir, 'stdout'), 'w') as out:
+            start = time.time()
+            rc = subprocess.call(cmd, cwd=workdir, env=env, stdin=subprocess.DEVNULL, stdout=out, stderr=out)
+            times.append(time.time() - start)
+        if rc:
+            with open(os.path.join(workdir, 'stdout')) as out:
+                sys.stderr.write(out.read()[-2000:])
+            raise SystemExit('ansible-playbook with {} failed with rc {}'.format(', '.join(plugin_paths), rc))
+    return median(times)
+
+
+def main():
+    parser = ArgumentParser(description='Measure the startup cost of the repo\'s plugin directories.')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each playbook configuration')
+    parser.add_argument('--top', type=int, default=3, help='heaviest new imports to list for each plugin')
+    parser.add_argument('--skip-imports', action='store_true', help='only time ansible-playbook')
+    args = parser.parse_args()
+
+    if not args.skip_imports:
+        print('{:<60} {:>9}  {}'.format('plugin', 'import', 'heaviest new imports'))
+        for directory in PLUGIN_PATHS:
+            for path in sorted(glob.glob(os.path.join(REPO, directory, '*.py'))):
+                ms, heaviest = import_plugin(directory, path)
+                print('{:<60} {:>7.1f}ms  {}'.format(os.path.relpath(path, REPO), ms, ', '.join(
+                    '{} {:.1f}ms'.format(name, cumulative) for name, cumulative in heaviest[:args.top])))
+        print('')
+
+    workdir = tempfile.mkdtemp(prefix='startup.')
+    try:
+        shutil.copy(os.path.join(REPO, 'ping.yml'), workdir)
+        runs = [('none', [])] + [(path, [path]) for path in PLUGIN_PATHS] + [('all', list(PLUGIN_PATHS))]
+        print('{:<46} {:>14} {:>10}'.format('plugin path', 'syntax-check', 'ping.yml'))
+        base = None
+        for name, plugin_paths in runs:
+            syntax = run_playbook(workdir, plugin_paths, args, True)
+            ping = run_playbook(workdir, plugin_paths, args, False)
+            base = base or (syntax, ping)
+            print('{:<46} {:>7.3f}s {:>+5.0f}ms {:>7.3f}s {:>+5.0f}ms'.format(
+                name, syntax, (syntax - base[0]) * 1000, ping, (ping - base[1]) * 1000))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
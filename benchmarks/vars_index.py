@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Times ansible-inventory --list over a generated host_vars tree with the
+host_group_vars vars plugin and with vars_index from vars_plugins/, cold (no
+index yet), warm (index up to date) and after touching a few files.
+
+    benchmarks/vars_index.py --hosts 5000 --groups 50
+"""
+from argparse import ArgumentParser
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from host_vars_tree import write_tree
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def list_inventory(vars_plugin, inventory, index_dir, workdir):
+    ''' returns the wall time and the digest of the --list output '''
+    env = dict(os.environ, ANSIBLE_VARS_ENABLED=vars_plugin, ANSIBLE_VARS_PLUGINS=os.path.join(REPO, 'vars_plugins'),
+               VARS_INDEX_DIR=index_dir)
+    output = os.path.join(workdir, 'inventory.json')
+    # ansible-inventory fails on non-blocking stdout, so write to a file
+    with open(output, 'w') as out, open(os.path.join(workdir, 'stderr'), 'w') as err:
+        start = time.time()
+        rc = subprocess.call(['ansible-inventory', '-i', inventory, '--list'], env=env,
+                             stdin=subprocess.DEVNULL, stdout=out, stderr=err)
+        elapsed = time.time() - start
+    if rc:
+        with open(os.path.join(workdir, 'stderr')) as err:
+            sys.stderr.write(err.read()[-2000:])
+        raise SystemExit('ansible-inventory with {} failed with rc {}'.format(vars_plugin, rc))
+    with open(output) as f:
+        digest = hashlib.sha1(json.dumps(json.load(f), sort_keys=True).encode()).hexdigest()
+    return elapsed, digest
+
+
+def main():
+    parser = ArgumentParser(description='Compare the host_group_vars and vars_index vars plugins.')
+    parser.add_argument('--hosts', type=int, default=5000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--vars-per-file', type=int, default=20)
+    parser.add_argument('--touch', type=int, default=10, help='host_vars files changed before the last run')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='vars_index.')
+    try:
+        inventory = write_tree(os.path.join(workdir, 'tree'), args.hosts, args.groups, args.vars_per_file)
+        index_dir = os.path.join(workdir, 'index')
+
+        touched = os.path.join(workdir, 'tree', 'host_vars')
+        runs = [('host_group_vars', 'host_group_vars', 0), ('vars_index', 'vars_index cold', 0),
+                ('vars_index', 'vars_index warm', 0), ('vars_index', 'vars_index {} changed'.format(args.touch), args.touch)]
+        expected = None
+        print('{:<24} {:>10} {:>8}'.format('run', 'time', 'output'))
+        for vars_plugin, name, touch in runs:
+            if touch:
+                for filename in sorted(f for f in os.listdir(touched) if f.endswith('.yml'))[:touch]:
+                    with open(os.path.join(touched, filename), 'a') as f:
+                        f.write('touched: true\n')
+                # the output changes with the files, so host_group_vars sets what to expect again
+                expected = list_inventory('host_group_vars', inventory, index_dir, workdir)[1]
+            elapsed, digest = list_inventory(vars_plugin, inventory, index_dir, workdir)
+            expected = expected or digest
+            print('{:<24} {:>9.2f}s {:>8}'.format(name, elapsed, 'same' if digest == expected else 'DIFFERS'))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Writes an inventory whose group_vars hold hundreds of !vault values under several
+vault ids, then runs vault_bulk.yml with the default vars plugins and with the
+vault_prefetch vars plugin from vars_plugins/, and compares the wall time.
+
+    benchmarks/vault_prefetch.py --values 500 --vault-ids 3 --hosts 10
+"""
+from argparse import ArgumentParser
+import os
+import shutil
+import tempfile
+
+from ansible.parsing.vault import VaultLib, VaultSecret
+
+from playbook_run import REPO, fail, run_playbook, write_inventory
+
+
+def write_vaulted_inventory(directory, num_hosts, num_values, num_vault_ids):
+    ''' inventory plus group_vars/all with num_values vaulted vars, returns the --vault-id arguments '''
+    path = write_inventory(directory, num_hosts, prefix='vault_host_')
+
+    vault_args = []
+    secrets = []
+    for i in range(num_vault_ids):
+        vault_id = 'bench{}'.format(i)
+        password_file = os.path.join(directory, '{}.pass'.format(vault_id))
+        with open(password_file, 'w') as f:
+            f.write('secret{}\n'.format(i))
+        vault_args.extend(['--vault-id', '{}@{}'.format(vault_id, password_file)])
+        secrets.append((vault_id, VaultSecret('secret{}'.format(i).encode())))
+
+    vault = VaultLib(secrets)
+    os.mkdir(os.path.join(directory, 'group_vars'))
+    with open(os.path.join(directory, 'group_vars', 'all.yml'), 'w') as f:
+        for i in range(num_values):
+            vault_id, secret = secrets[i % num_vault_ids]
+            ciphertext = vault.encrypt('value {} of {}'.format(i, vault_id), secret, vault_id).decode()
+            f.write('vaulted_{:05d}: !vault |\n'.format(i))
+            f.write(''.join('  {}\n'.format(line) for line in ciphertext.splitlines()))
+    return path, vault_args
+
+
+def run(vars_plugins, inventory, vault_args, args, workdir):
+    env = dict(os.environ, ANSIBLE_VARS_ENABLED=vars_plugins)
+    cmd = ['ansible-playbook', '-i', inventory, '-f', str(args.forks), '-e', 'num_rounds={}'.format(args.rounds)]
+    cmd += vault_args + [os.path.join(REPO, 'vault_bulk.yml')]
+    log = os.path.join(workdir, 'stdout')
+    rc, elapsed, _ = run_playbook(cmd, log, env)
+    if rc:
+        fail(log, 'run with {} failed with rc {}'.format(vars_plugins, rc))
+    return elapsed
+
+
+def main():
+    parser = ArgumentParser(description='Compare vaulted group_vars with and without the vault_prefetch vars plugin.')
+    parser.add_argument('--values', type=int, default=500)
+    parser.add_argument('--vault-ids', type=int, default=3)
+    parser.add_argument('--hosts', type=int, default=10)
+    parser.add_argument('--forks', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=1, help='times each host uses every vaulted var')
+    parser.add_argument('--vars-plugins', nargs='+', default=['host_group_vars', 'host_group_vars,vault_prefetch'])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='vault_prefetch.')
+    try:
+        inventory, vault_args = write_vaulted_inventory(workdir, args.hosts, args.values, args.vault_ids)
+        print('{:<32} {:>10}'.format('vars plugins', 'time'))
+        for vars_plugins in args.vars_plugins:
+            print('{:<32} {:>9.2f}s'.format(vars_plugins, run(vars_plugins, inventory, vault_args, args, workdir)))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    cache: sharded
+    short_description: Compressed, append-only shard files with an in-memory index.
+    description:
+        - Stores every host's facts as a zlib compressed record appended to one of a small number
+          of shard files, instead of one pretty-printed file per host.
+        - Each record header holds the key uncompressed, so looking up one host only scans the
+          headers of its shard and decompresses that host's record.
+        - Decoded values are kept in an in-memory LRU of C(_lru_size) entries.
+        - Shards are rewritten without stale records once they are mostly garbage.
+    version_added: "2.8"
+    options:
+      _uri:
+        required: True
+        description:
+          - Directory for the shard files
+        env:
+          - name: ANSIBLE_CACHE_PLUGIN_CONNECTION
+        ini:
+          - key: fact_caching_connection
+            section: defaults
+        type: path
+      _prefix:
+        description: User defined prefix to use when creating the shard files
+        env:
+          - name: ANSIBLE_CACHE_PLUGIN_PREFIX
+        ini:
+          - key: fact_caching_prefix
+            section: defaults
+      _timeout:
+        default: 86400
+        description: Expiration timeout for the cache plugin data
+        env:
+          - name: ANSIBLE_CACHE_PLUGIN_TIMEOUT
+        ini:
+          - key: fact_caching_timeout
+            section: defaults
+        type: integer
+      _shards:
+        default: 16
+        description: Number of shard files, hosts are spread over them by a hash of their name
+        env:
+          - name: ANSIBLE_CACHE_PLUGIN_SHARDS
+        ini:
+          - key: fact_caching_shards
+            section: defaults
+        type: integer
+      _lru_size:
+        default: 1024
+        description: Number of decoded entries kept in memory
+        env:
+          - name: ANSIBLE_CACHE_PLUGIN_LRU_SIZE
+        ini:
+          - key: fact_caching_lru_size
+            section: defaults
+        type: integer
+'''
+
+import fcntl
+import json
+import os
+import struct
+import time
+import zlib
+from collections import OrderedDict
+
+from ansible.errors import AnsibleError
+from ansible.plugins.cache import BaseCacheModule
+
+# key length, data length, timestamp, kind
+HEADER = struct.Struct('>IIdB')
+TOMBSTONE, JSON_VALUE, TEXT_VALUE = 0, 1, 2
+
+# rewrite a shard once stale records outweigh live ones and it is at least this big
+COMPACT_MIN_SIZE = 1 << 20
+
+
+class Shard(object):
+    ''' one append-only shard file and the index of the records in it '''
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self.inode = None
+        self.scanned_to = 0
+        self.dead_bytes = 0
+
+    def refresh(self):
+        ''' picks up records appended, or a rewrite done, by this or any other process '''
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self.index, self.inode, self.scanned_to, self.dead_bytes = {}, None, 0, 0
+            return
+        if st.st_ino != self.inode:
+            self.index, self.inode, self.scanned_to, self.dead_bytes = {}, st.st_ino, 0, 0
+        if st.st_size > self.scanned_to:
+            with open(self.path, 'rb') as f:
+                self._scan(f, st.st_size)
+
+    def _scan(self, f, size):
+        f.seek(self.scanned_to)
+        offset = self.scanned_to
+        while offset + HEADER.size <= size:
+            key_len, data_len, timestamp, kind = HEADER.unpack(f.read(HEADER.size))
+            key = f.read(key_len).decode('utf-8')
+            data_offset = offset + HEADER.size + key_len
+            if data_offset + data_len > size:
+                # partially written record, pick it up on the next refresh
+                break
+            old = self.index.pop(key, None)
+            if old is not None:
+                self.dead_bytes += HEADER.size + key_len + old[1]
+            if kind == TOMBSTONE:
+                self.dead_bytes += HEADER.size + key_len
+            else:
+                self.index[key] = (data_offset, data_len, timestamp, kind)
+            f.seek(data_len, os.SEEK_CUR)
+            offset = data_offset + data_len
+        self.scanned_to = offset
+
+    def read(self, key):
+        data_offset, data_len, timestamp, kind = self.index[key]
+        with open(self.path, 'rb') as f:
+            f.seek(data_offset)
+            data = zlib.decompress(f.read(data_len)).decode('utf-8')
+        return data if kind == TEXT_VALUE else json.loads(data)
+
+    def append(self, key, kind, data=b''):
+        key = key.encode('utf-8')
+        while True:
+            with open(self.path, 'ab') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    # another process may have compacted the shard while we waited for the lock
+                    if os.fstat(f.fileno()).st_ino != os.stat(self.path).st_ino:
+                        continue
+                    f.write(HEADER.pack(len(key), len(data), time.time(), kind) + key + data)
+                    break
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        self.refresh()
+        if self.scanned_to >= COMPACT_MIN_SIZE and self.dead_bytes * 2 > self.scanned_to:
+            self.compact()
+
+    def compact(self):
+        ''' rewrites the shard with only its live records, copied without recompressing '''
+        tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(self.path, 'rb') as src:
+            fcntl.flock(src, fcntl.LOCK_EX)
+            try:
+                self.index, self.scanned_to, self.dead_bytes = {}, 0, 0
+                self._scan(src, os.fstat(src.fileno()).st_size)
+                with open(tmp_path, 'wb') as dst:
+                    for key, (data_offset, data_len, timestamp, kind) in self.index.items():
+                        src.seek(data_offset)
+                        encoded = key.encode('utf-8')
+                        dst.write(HEADER.pack(len(encoded), data_len, timestamp, kind) + encoded + src.read(data_len))
+                os.rename(tmp_path, self.path)
+            finally:
+                fcntl.flock(src, fcntl.LOCK_UN)
+        self.inode = None
+        self.refresh()
+
+
+class CacheModule(BaseCacheModule):
+    ''' A caching module backed by compressed, append-only shard files. '''
+
+    def __init__(self, *args, **kwargs):
+        super(CacheModule, self).__init__(*args, **kwargs)
+        self._cache_dir = os.path.expanduser(os.path.expandvars(self.get_option('_uri') or ''))
+        if not self._cache_dir:
+            raise AnsibleError("error, 'sharded' cache plugin requires the 'fact_caching_connection' config option "
+                               "to be set (to a writeable directory path)")
+        if not os.path.exists(self._cache_dir):
+            os.makedirs(self._cache_dir)
+        self._timeout = float(self.get_option('_timeout'))
+        self._lru_size = self.get_option('_lru_size')
+        self._lru = OrderedDict()
+        prefix = self.get_option('_prefix') or ''
+        self._shards = [Shard(os.path.join(self._cache_dir, '%sshard-%03d' % (prefix, i)))
+                        for i in range(self.get_option('_shards'))]
+        self._refreshed = set()
+
+    def _shard(self, key):
+        shard = self._shards[zlib.crc32(key.encode('utf-8')) % len(self._shards)]
+        if shard.path not in self._refreshed:
+            shard.refresh()
+            self._refreshed.add(shard.path)
+        return shard
+
+    def _expired(self, timestamp):
+        return self._timeout > 0 and time.time() - timestamp > self._timeout
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, key):
+        shard = self._shard(key)
+        if key not in shard.index or self._expired(shard.index[key][2]):
+            self._lru.pop(key, None)
+            raise KeyError(key)
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            return self._lru[key]
+        value = shard.read(key)
+        self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        if isinstance(value, str):
+            # ansible-core 2.19+ hands persistent cache plugins JSON text already
+            kind, data = TEXT_VALUE, value
+        else:
+            kind, data = JSON_VALUE, json.dumps(value, separators=(',', ':'))
+        self._shard(key).append(key, kind, zlib.compress(data.encode('utf-8'), 6))
+        self._remember(key, value)
+
+    def keys(self):
+        keys = []
+        for shard in self._shards:
+            shard.refresh()
+            self._refreshed.add(shard.path)
+            keys.extend(key for key, record in shard.index.items() if not self._expired(record[2]))
+        return keys
+
+    def contains(self, key):
+        shard = self._shard(key)
+        return key in shard.index and not self._expired(shard.index[key][2])
+
+    def delete(self, key):
+        shard = self._shard(key)
+        if key in shard.index:
+            shard.append(key, TOMBSTONE)
+        self._lru.pop(key, None)
+
+    def flush(self):
+        for shard in self._shards:
+            try:
+                os.remove(shard.path)
+            except OSError:
+                pass
+            shard.refresh()
+        self._lru.clear()
+
+    def copy(self):
+        return dict((key, self.get(key)) for key in self.keys())
@@ -0,0 +1,236 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+    callback: jsonl_sink
+    type: stdout
+    short_description: Buffered JSON lines event output for high volume playbooks
+    version_added: "2.8"
+    description:
+        - Queues playbook events on a bounded queue and serializes them to JSON lines on a
+          background writer thread, so formatting and flushing never happen on the
+          controller's result processing path.
+        - Lines are written in batches, optionally gzip compressed.
+        - When the queue is full, events are dropped and counted instead of stalling the controller,
+          unless C(on_full) is set to C(block).
+        - Reports events written, events dropped and events/sec at the end of the run.
+    requirements:
+        - set as stdout callback in configuration
+    options:
+        path:
+            description: File to write events to, C(-) for stdout.
+            default: '-'
+            env:
+                - name: JSONL_SINK_PATH
+            ini:
+                - section: callback_jsonl_sink
+                  key: path
+        compress:
+            description: Gzip compress the output.
+            type: bool
+            default: False
+            env:
+                - name: JSONL_SINK_COMPRESS
+            ini:
+                - section: callback_jsonl_sink
+                  key: compress
+        queue_size:
+            description: Number of events that can wait for the writer thread.
+            type: int
+            default: 10000
+            env:
+                - name: JSONL_SINK_QUEUE_SIZE
+            ini:
+                - section: callback_jsonl_sink
+                  key: queue_size
+        batch_size:
+            description: Maximum number of events serialized into a single write.
+            type: int
+            default: 1000
+            env:
+                - name: JSONL_SINK_BATCH_SIZE
+            ini:
+                - section: callback_jsonl_sink
+                  key: batch_size
+        on_full:
+            description: What to do with an event when the queue is full.
+            choices: ['drop', 'block']
+            default: drop
+            env:
+                - name: JSONL_SINK_ON_FULL
+            ini:
+                - section: callback_jsonl_sink
+                  key: on_full
+'''
+
+import sys
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from ansible.errors import AnsibleError
+from ansible.module_utils.common.text.converters import to_native
+from ansible.parsing.ajson import AnsibleJSONEncoder
+from ansible.plugins.callback import CallbackBase
+
+_STOP = object()
+
+# seconds between checks that the writer thread is still alive while waiting for room in the queue
+PUT_TIMEOUT = 1
+
+
+class CallbackModule(CallbackBase):
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'stdout'
+    CALLBACK_NAME = 'jsonl_sink'
+
+    def __init__(self, *args, **kwargs):
+        super(CallbackModule, self).__init__(*args, **kwargs)
+        self._queue = None
+        self._writer = None
+        self._started = None
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+
+    def set_options(self, *args, **kwargs):
+        super(CallbackModule, self).set_options(*args, **kwargs)
+        if self._writer is not None:
+            return
+        self._queue = queue.Queue(maxsize=self.get_option('queue_size'))
+        self._block = self.get_option('on_full') == 'block'
+        # opened here, so a bad path fails the run up front instead of killing the writer thread
+        try:
+            self._raw = self._open()
+        except (IOError, OSError) as e:
+            raise AnsibleError('jsonl_sink could not open %s: %s' % (self.get_option('path'), to_native(e)))
+        self._stream = self._raw
+        if self.get_option('compress'):
+            import gzip
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=1)
+        self._writer = threading.Thread(target=self._write_events, name='jsonl_sink')
+        self._writer.daemon = True
+        self._started = time.time()
+        self._writer.start()
+
+    def _open(self):
+        path = self.get_option('path')
+        if path == '-':
+            return getattr(sys.stdout, 'buffer', sys.stdout)
+        return open(path, 'wb')
+
+    def _write_events(self):
+        ''' writer thread: drains the queue in batches until it sees _STOP or a write fails '''
+        try:
+            self._drain()
+        except Exception as e:
+            # recorded for the stats, _put stops waiting on the queue once this thread is gone
+            self.error = e
+        try:
+            self._close()
+        except Exception as e:
+            self.error = self.error or e
+
+    def _drain(self):
+        encoder = AnsibleJSONEncoder(separators=(',', ':'))
+        batch_size = self.get_option('batch_size')
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _STOP:
+                stopping = True
+                batch.pop()
+            if batch:
+                self._stream.write(''.join(encoder.encode(event) + '\n' for event in batch).encode('utf-8'))
+                self.written += len(batch)
+
+    def _close(self):
+        try:
+            if self._stream is not self._raw:
+                self._stream.close()
+        finally:
+            if self._raw is sys.stdout or self._raw is getattr(sys.stdout, 'buffer', None):
+                self._raw.flush()
+            else:
+                self._raw.close()
+
+    def _put(self, item, block):
+        ''' queues item, False if it was not queued because the queue is full or the writer is gone '''
+        while self._writer.is_alive():
+            try:
+                self._queue.put(item, timeout=PUT_TIMEOUT if block else None, block=block)
+                return True
+            except queue.Full:
+                if not block:
+                    return False
+        return False
+
+    def _emit(self, event, **data):
+        data['event'] = event
+        data['time'] = time.time()
+        if not self._put(data, self._block):
+            self.dropped += 1
+
+    def _emit_result(self, event, result, **data):
+        # shallow copy, the writer thread serializes it later
+        self._emit(event, host=result._host.get_name(), task=result._task.get_name(),
+                   task_uuid=result._task._uuid, result=dict(result._result), **data)
+
+    def v2_playbook_on_start(self, playbook):
+        self._emit('playbook_on_start', playbook=playbook._file_name)
+
+    def v2_playbook_on_play_start(self, play):
+        self._emit('playbook_on_play_start', play=play.get_name(), play_uuid=play._uuid)
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._emit('playbook_on_task_start', task=task.get_name(), task_uuid=task._uuid)
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._emit('playbook_on_handler_task_start', task=task.get_name(), task_uuid=task._uuid)
+
+    def v2_runner_on_ok(self, result):
+        self._emit_result('runner_on_ok', result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._emit_result('runner_on_failed', result, ignore_errors=ignore_errors)
+
+    def v2_runner_on_skipped(self, result):
+        self._emit_result('runner_on_skipped', result)
+
+    def v2_runner_on_unreachable(self, result):
+        self._emit_result('runner_on_unreachable', result)
+
+    def v2_runner_retry(self, result):
+        self._emit_result('runner_retry', result)
+
+    def v2_runner_item_on_ok(self, result):
+        self._emit_result('runner_item_on_ok', result)
+
+    def v2_runner_item_on_failed(self, result):
+        self._emit_result('runner_item_on_failed', result)
+
+    def v2_runner_item_on_skipped(self, result):
+        self._emit_result('runner_item_on_skipped', result)
+
+    def v2_playbook_on_stats(self, stats):
+        summary = dict((host, stats.summarize(host)) for host in sorted(stats.processed))
+        # the stats event and _STOP always wait for room in the queue, even when dropping
+        if not self._put({'event': 'playbook_on_stats', 'time': time.time(), 'stats': summary}, True):
+            self.dropped += 1
+        self._put(_STOP, True)
+        self._writer.join()
+        if self.error is not None:
+            self._display.error('jsonl_sink: writing events failed, later events were dropped: %s' % to_native(self.error))
+        elapsed = time.time() - self._started
+        self._display.display('jsonl_sink: {0} events written, {1} dropped, {2:.0f} events/sec'.format(
+            self.written, self.dropped, self.written / elapsed if elapsed else 0), stderr=True)
@@ -0,0 +1,223 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+    callback: memory_profile
+    type: aggregate
+    short_description: Controller RSS and top allocation sites at play, task and stats boundaries
+    version_added: "2.8"
+    description:
+        - Samples the controller's RSS and, with C(trace) on, a tracemalloc snapshot when each play
+          starts, when each task or handler starts, and when the stats are sent.
+        - Each sample is compared with the one before it, and the allocation sites that grew most are
+          kept, by source line and by part of ansible, e.g. C(vars), C(inventory) or C(executor).
+          Only the previous and the first snapshot are held at any time.
+        - Writes a compact JSON report when the playbook finishes, with the growth from the first
+          sample to the last as well.
+        - Tracing starts when the callback loads. Set C(PYTHONTRACEMALLOC) to trace allocations made
+          before that too. Forked workers stop tracing, so only the controller is measured.
+        - tracemalloc slows the controller down and adds to its RSS, turn C(trace) off for RSS alone.
+    requirements:
+        - enable in configuration
+    options:
+        output_file:
+            description: File to write the JSON report to. The report is only displayed if unset.
+            env:
+                - name: MEMORY_PROFILE_OUTPUT_FILE
+            ini:
+                - section: callback_memory_profile
+                  key: output_file
+        trace:
+            description: Take tracemalloc snapshots, not just RSS.
+            type: bool
+            default: True
+            env:
+                - name: MEMORY_PROFILE_TRACE
+            ini:
+                - section: callback_memory_profile
+                  key: trace
+        top:
+            description: Number of allocation sites to keep for each sample.
+            type: int
+            default: 10
+            env:
+                - name: MEMORY_PROFILE_TOP
+            ini:
+                - section: callback_memory_profile
+                  key: top
+        frames:
+            description: Number of frames tracemalloc keeps for each allocation, when it starts tracing.
+            type: int
+            default: 1
+            env:
+                - name: MEMORY_PROFILE_FRAMES
+            ini:
+                - section: callback_memory_profile
+                  key: frames
+        samples:
+            description: Boundaries to sample at.
+            type: list
+            elements: str
+            choices: ['play', 'task', 'stats']
+            default: ['play', 'task', 'stats']
+            env:
+                - name: MEMORY_PROFILE_SAMPLES
+            ini:
+                - section: callback_memory_profile
+                  key: samples
+'''
+
+import json
+import os
+import sys
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+# every callback in the path is imported on every run, so tracemalloc and resource
+# are only imported once this one is enabled
+tracemalloc = None
+resource = None
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# longest first, so packages are named from the innermost entry
+SYS_PATHS = sorted((os.path.join(path, '') for path in sys.path if path), key=len, reverse=True)
+
+
+def rss_kb():
+    ''' current RSS, or the peak where /proc is not available '''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE // 1024
+    except (IOError, OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def short(filename):
+    ''' filename relative to the sys.path entry it was imported from '''
+    for path in SYS_PATHS:
+        if filename.startswith(path):
+            return filename[len(path):]
+    return filename
+
+
+def area(filename):
+    ''' the part of ansible a source file belongs to, e.g. ansible/vars or ansible/plugins/strategy '''
+    parts = short(filename).split(os.sep)
+    if parts[0] != 'ansible' or len(parts) < 3:
+        return '/'.join(parts)
+    if parts[1] in ('plugins', 'module_utils', '_internal') and len(parts) > 3:
+        return '/'.join(parts[:3])
+    return '/'.join(parts[:2])
+
+
+def _stop_tracing():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+class CallbackModule(CallbackBase):
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'memory_profile'
+    CALLBACK_NEEDS_WHITELIST = True
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, *args, **kwargs):
+        super(CallbackModule, self).__init__(*args, **kwargs)
+        self._started = time.time()
+        self._first = None
+        self._previous = None
+        self._samples = []
+        self._trace = None
+
+    def set_options(self, *args, **kwargs):
+        super(CallbackModule, self).set_options(*args, **kwargs)
+        if self._trace is not None:
+            return
+        global resource, tracemalloc
+        import resource
+        import tracemalloc
+
+        self._trace = self.get_option('trace')
+        self._sample_at = set(self.get_option('samples'))
+        # the tracing itself and the import machinery are not what we are looking for
+        self._ignored = (tracemalloc.Filter(False, tracemalloc.__file__),
+                         tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                         tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+                         tracemalloc.Filter(False, '<unknown>'),
+                         tracemalloc.Filter(False, __file__))
+        if self._trace and not tracemalloc.is_tracing():
+            tracemalloc.start(self.get_option('frames'))
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=_stop_tracing)
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self._ignored)
+
+    def _top(self, snapshot, since):
+        ''' the sites and areas that grew most from since to snapshot '''
+        top = self.get_option('top')
+        lines = [stat for stat in snapshot.compare_to(since, 'lineno') if stat.size_diff > 0][:top]
+        areas = {}
+        for stat in snapshot.compare_to(since, 'filename'):
+            name = area(stat.traceback[0].filename)
+            areas[name] = areas.get(name, 0) + stat.size_diff
+        return {
+            'sites': [['%s:%d' % (short(stat.traceback[0].filename), stat.traceback[0].lineno),
+                       stat.size_diff // 1024, stat.count_diff] for stat in lines],
+            'areas': dict((name, size // 1024) for name, size in
+                          sorted(areas.items(), key=lambda item: item[1], reverse=True)[:top] if size >= 1024),
+        }
+
+    def _sample(self, kind, label):
+        if kind not in self._sample_at:
+            return
+        sample = {'kind': kind, 'label': label, 'time': round(time.time() - self._started, 3), 'rss_kb': rss_kb()}
+        if self._trace and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            sample['traced_kb'] = current // 1024
+            sample['traced_peak_kb'] = peak // 1024
+            snapshot = self._snapshot()
+            if self._previous is not None:
+                sample.update(self._top(snapshot, self._previous))
+            if self._first is None:
+                self._first = snapshot
+            self._previous = snapshot
+        self._samples.append(sample)
+
+    def v2_playbook_on_play_start(self, play):
+        self._sample('play', play.get_name())
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._sample('task', task.get_name())
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._sample('task', task.get_name())
+
+    def v2_playbook_on_stats(self, stats):
+        self._sample('stats', 'stats')
+        report = {
+            'hosts': len(stats.processed),
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'samples': self._samples,
+        }
+        if self._first is not None and self._previous is not None and self._first is not self._previous:
+            report['growth'] = self._top(self._previous, self._first)
+        self._first = self._previous = None
+
+        output_file = self.get_option('output_file')
+        if output_file:
+            with open(output_file, 'w') as f:
+                json.dump(report, f, separators=(',', ':'))
+
+        self._display.banner('MEMORY PROFILE (RSS KB, traced KB, largest growth since the previous sample)')
+        for sample in self._samples:
+            top = sample.get('sites', [])[:1]
+            self._display.display('%-5s %-50s %9d %9s  %s' % (
+                sample['kind'], sample['label'][:50], sample['rss_kb'], sample.get('traced_kb', '-'),
+                '%s +%dKB' % tuple(top[0][:2]) if top else ''))
+        for site, size_kb, count in report.get('growth', {}).get('sites', []):
+            self._display.display('growth %+9dKB %+8d blocks  %s' % (size_kb, count, site))
@@ -0,0 +1,187 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+    callback: stream_stats
+    type: aggregate
+    short_description: Incremental stats aggregation for the stream_stats action, written out as streamed JSON
+    version_added: "2.8"
+    description:
+        - Applies the stats returned by the C(stream_stats) action as merge patches while the results come in.
+          C(stream_stats) takes the same options as C(set_stats), but the controller's strategy never sees
+          the stats, so it does not deep merge them or hold them.
+        - Aggregated run stats are merged in place, and only the keys in each patch are touched. Dicts are
+          merged recursively, lists are extended and other values are added, the way C(set_stats) does.
+        - Per host stats are not held in memory. The value of each changed key is JSON encoded and appended
+          to a spill file, and only its offset is kept. A value that is set again unchanged is not written.
+        - When the playbook finishes, the artifact is streamed to C(output_file) in the layout of ansible's
+          custom stats, the run stats under C(_run) and each host's under its name, with per host values
+          copied from the spill file.
+        - Per host stats are applied to the host that returned them, also for C(run_once) tasks.
+        - These stats are not added to ansible's own custom stats, so C(show_custom_stats) does not show them.
+    requirements:
+        - enable in configuration
+    options:
+        output_file:
+            description: File to write the artifact to. Only a summary is displayed if unset.
+            env:
+                - name: STREAM_STATS_OUTPUT_FILE
+            ini:
+                - section: callback_stream_stats
+                  key: output_file
+        spill_dir:
+            description: Directory for the spill file, the system default temporary directory if unset.
+            type: path
+            env:
+                - name: STREAM_STATS_SPILL_DIR
+            ini:
+                - section: callback_stream_stats
+                  key: spill_dir
+        include_set_stats:
+            description:
+                - Also write the custom stats of plain C(set_stats) tasks to the artifact. Keys set by
+                  C(stream_stats) take precedence.
+            type: bool
+            default: False
+            env:
+                - name: STREAM_STATS_INCLUDE_SET_STATS
+            ini:
+                - section: callback_stream_stats
+                  key: include_set_stats
+'''
+
+from copy import deepcopy
+import json
+import tempfile
+import time
+
+from ansible.module_utils.common._collections_compat import MutableMapping
+from ansible.parsing.ajson import AnsibleJSONEncoder
+from ansible.plugins.callback import CallbackBase
+
+RUN = '_run'
+
+
+def merge_patch(current, patch):
+    ''' merges patch into current in place the way set_stats aggregates, returns the merged value '''
+    if not isinstance(patch, type(current)):
+        # set_stats ignores aggregation of mismatching types too
+        return current
+    if isinstance(patch, MutableMapping):
+        for key, value in patch.items():
+            if isinstance(value, MutableMapping) and isinstance(current.get(key), MutableMapping):
+                merge_patch(current[key], value)
+            else:
+                current[key] = value
+        return current
+    current += patch
+    return current
+
+
+class CallbackModule(CallbackBase):
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'stream_stats'
+    CALLBACK_NEEDS_WHITELIST = True
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, *args, **kwargs):
+        super(CallbackModule, self).__init__(*args, **kwargs)
+        self._encoder = AnsibleJSONEncoder(separators=(',', ':'))
+        self._run = {}
+        # host -> key -> (offset, length) of its JSON in the spill file
+        self._index = {}
+        self._spill = None
+        self._spilled = 0
+        self.patches = 0
+        self.changed = 0
+        self.unchanged = 0
+
+    def _read(self, host, key):
+        offset, length = self._index[host][key]
+        self._spill.seek(offset)
+        return self._spill.read(length)
+
+    def _write(self, host, key, value):
+        encoded = self._encoder.encode(value).encode('utf-8')
+        keys = self._index.setdefault(host, {})
+        if key in keys and keys[key][1] == len(encoded) and self._read(host, key) == encoded:
+            self.unchanged += 1
+            return
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix='stream_stats.', dir=self.get_option('spill_dir'))
+        self._spill.seek(0, 2)
+        keys[key] = (self._spill.tell(), len(encoded))
+        self._spill.write(encoded)
+        self._spilled += len(encoded)
+        self.changed += 1
+
+    def _apply(self, host, stats):
+        data = stats.get('data')
+        if not data:
+            return
+        self.patches += 1
+        aggregate = stats.get('aggregate', True)
+        if not stats.get('per_host', False):
+            # merged values end up sharing the patch's lists and dicts, which the other callbacks still see
+            for key, value in deepcopy(data).items():
+                if aggregate and key in self._run:
+                    self._run[key] = merge_patch(self._run[key], value)
+                else:
+                    self._run[key] = value
+                self.changed += 1
+            return
+        for key, value in data.items():
+            if aggregate and key in self._index.get(host, {}):
+                value = merge_patch(json.loads(self._read(host, key).decode('utf-8')), value)
+            self._write(host, key, value)
+
+    def v2_runner_on_ok(self, result):
+        host = result._host.get_name()
+        for item in result._result.get('results', [result._result]):
+            if isinstance(item, MutableMapping) and 'stream_stats' in item:
+                self._apply(host, item['stream_stats'])
+
+    def _stream(self, stream, custom):
+        ''' writes the artifact, with per host values copied from the spill file '''
+        write = stream.write
+        run = dict(custom.get(RUN, {}), **self._run)
+        write(b'{')
+        if run:
+            write(b'"_run":')
+            for chunk in self._encoder.iterencode(run):
+                write(chunk.encode('utf-8'))
+        hosts = sorted(set(self._index) | set(host for host in custom if host != RUN))
+        for number, host in enumerate(hosts):
+            write(b',' if run or number else b'')
+            write(('%s:{' % self._encoder.encode(host)).encode('utf-8'))
+            keys = self._index.get(host, {})
+            extra = dict((key, value) for key, value in custom.get(host, {}).items() if key not in keys)
+            for position, key in enumerate(sorted(keys)):
+                write(('%s%s:' % (',' if position else '', self._encoder.encode(key))).encode('utf-8'))
+                write(self._read(host, key))
+            for position, (key, value) in enumerate(sorted(extra.items())):
+                write(('%s%s:%s' % (',' if keys or position else '', self._encoder.encode(key),
+                                    self._encoder.encode(value))).encode('utf-8'))
+            write(b'}')
+        write(b'}\n')
+
+    def v2_playbook_on_stats(self, stats):
+        started = time.time()
+        custom = stats.custom if self.get_option('include_set_stats') else {}
+        output_file = self.get_option('output_file')
+        size = 0
+        if output_file:
+            with open(output_file, 'wb') as f:
+                self._stream(f, custom)
+                size = f.tell()
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+        self._display.banner('STREAM STATS')
+        self._display.display('%d patches, %d run keys, %d hosts, %d keys changed, %d unchanged, %d KB spilled' % (
+            self.patches, len(self._run), len(self._index), self.changed, self.unchanged, self._spilled // 1024))
+        if output_file:
+            self._display.display('%d KB written to %s in %.2fs' % (size // 1024, output_file, time.time() - started))
@@ -0,0 +1,186 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+    callback: task_latency
+    type: aggregate
+    short_description: p50/p95/p99/max latency per task and per host
+    version_added: "2.8"
+    description:
+        - Timestamps task starts, worker starts and results, and splits each host-task into
+          C(queue) (task start until the worker reports it started, i.e. queueing and fork)
+          and C(run) (worker start until the result reached the controller).
+        - Latencies go into fixed-precision log-linear histograms, so memory does not grow
+          with the number of events.
+        - Writes a compact JSON summary when the playbook finishes.
+    requirements:
+        - enable in configuration
+    options:
+        output_file:
+            description: File to write the JSON summary to. The summary is only displayed if unset.
+            env:
+                - name: TASK_LATENCY_OUTPUT_FILE
+            ini:
+                - section: callback_task_latency
+                  key: output_file
+        top_hosts:
+            description: Number of hosts, slowest p99 first, to include in the summary.
+            type: int
+            default: 20
+            env:
+                - name: TASK_LATENCY_TOP_HOSTS
+            ini:
+                - section: callback_task_latency
+                  key: top_hosts
+'''
+
+import json
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+
+class Histogram(object):
+    ''' log-linear histogram of microsecond latencies, accurate to 1/SUB_BUCKETS of the value '''
+
+    SUB_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BITS
+
+    __slots__ = ('buckets', 'count', 'max')
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.max = 0
+
+    def add(self, seconds):
+        us = max(int(seconds * 1000000), 0)
+        if us < 2 * self.SUB_BUCKETS:
+            index = us
+        else:
+            shift = us.bit_length() - self.SUB_BITS - 1
+            index = shift * self.SUB_BUCKETS + (us >> shift)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        if us > self.max:
+            self.max = us
+
+    def upper_bound(self, index):
+        if index < 2 * self.SUB_BUCKETS:
+            return index
+        shift = index // self.SUB_BUCKETS - 1
+        return ((index - shift * self.SUB_BUCKETS + 1) << shift) - 1
+
+    def quantile(self, q):
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def summary(self):
+        ''' quantiles in seconds '''
+        if not self.count:
+            return {'count': 0}
+        return {'count': self.count,
+                'p50': self.quantile(0.50) / 1000000.0,
+                'p95': self.quantile(0.95) / 1000000.0,
+                'p99': self.quantile(0.99) / 1000000.0,
+                'max': self.max / 1000000.0}
+
+
+class TaskLatency(object):
+
+    __slots__ = ('name', 'path', 'queue', 'run')
+
+    def __init__(self, task):
+        self.name = task.get_name()
+        self.path = task.get_path()
+        self.queue = Histogram()
+        self.run = Histogram()
+
+
+class CallbackModule(CallbackBase):
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'task_latency'
+    CALLBACK_NEEDS_WHITELIST = True
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, *args, **kwargs):
+        super(CallbackModule, self).__init__(*args, **kwargs)
+        self._task_started = {}
+        self._runner_started = {}
+        self._tasks = {}
+        self._hosts = {}
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._task_started[task._uuid] = time.time()
+        if task._uuid not in self._tasks:
+            self._tasks[task._uuid] = TaskLatency(task)
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self.v2_playbook_on_task_start(task, False)
+
+    def v2_runner_on_start(self, host, task):
+        now = time.time()
+        self._runner_started[(host.get_name(), task._uuid)] = now
+        latency = self._tasks.get(task._uuid)
+        if latency is not None:
+            latency.queue.add(now - self._task_started.get(task._uuid, now))
+
+    def _record_result(self, result):
+        now = time.time()
+        host, uuid = result._host.get_name(), result._task._uuid
+        started = self._runner_started.pop((host, uuid), None)
+        if started is None:
+            # no v2_runner_on_start, e.g. results of include tasks
+            started = self._task_started.get(uuid, now)
+        latency = self._tasks.get(uuid)
+        if latency is not None:
+            latency.run.add(now - started)
+        if host not in self._hosts:
+            self._hosts[host] = Histogram()
+        self._hosts[host].add(now - self._task_started.get(uuid, started))
+
+    def v2_runner_on_ok(self, result):
+        self._record_result(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._record_result(result)
+
+    def v2_runner_on_skipped(self, result):
+        self._record_result(result)
+
+    def v2_runner_on_unreachable(self, result):
+        self._record_result(result)
+
+    def v2_playbook_on_stats(self, stats):
+        hosts = sorted(self._hosts.items(), key=lambda item: item[1].quantile(0.99), reverse=True)
+        summary = {
+            'tasks': [dict(name=latency.name, path=latency.path,
+                           queue=latency.queue.summary(), run=latency.run.summary())
+                      for latency in self._tasks.values()],
+            'hosts': dict((host, histogram.summary()) for host, histogram in hosts[:self.get_option('top_hosts')]),
+            'host_count': len(hosts),
+        }
+
+        output_file = self.get_option('output_file')
+        if output_file:
+            with open(output_file, 'w') as f:
+                json.dump(summary, f, separators=(',', ':'))
+
+        self._display.banner('TASK LATENCY (queue p50/p95/p99/max | run p50/p95/p99/max, seconds)')
+        for task in summary['tasks']:
+            if task['run']['count']:
+                self._display.display('{0}: {1} | {2}'.format(
+                    task['name'] or task['path'], self._format(task['queue']), self._format(task['run'])))
+
+    @staticmethod
+    def _format(summary):
+        if not summary['count']:
+            return '-'
+        return '{p50:.3f}/{p95:.3f}/{p99:.3f}/{max:.3f}'.format(**summary)
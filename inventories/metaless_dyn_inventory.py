@@ -1,50 +1,131 @@
 #!/usr/bin/env python
 from argparse import ArgumentParser
-from pprint import pprint
 import json
+import os
+import sys
+import tempfile
+import time
 
-inventory = {'group_one': {'hosts': ['group_one_host_0{}'.format(i) for i in range(1, 6)]
-                                    + ['group_one_and_two_host_0{}'.format(i) for i in range(1, 6)]
-                                    + ['group_one_two_and_three_host_0{}'.format(i) for i in range(1, 6)],
-                           'vars': {'is_in_group_one': True,
-                                    'complex_var': [{"dir": "/opt/gwaf/logs",
-                                                     "sourcetype": "gwaf",
-                                                     "something_else": [1, 2, 3]}]}},
-             'group_two': {'hosts': ['group_two_host_0{}'.format(i) for i in range(1, 6)]
-                                    + ['group_one_and_two_host_0{}'.format(i) for i in range(1, 6)]
-                                    + ['group_two_and_three_host_0{}'.format(i) for i in range(1, 6)]
-                                    + ['group_one_two_and_three_host_0{}'.format(i) for i in range(1, 6)],
-                           'vars': {'is_in_group_two': True}},
-             'group_three': {'hosts': ['group_three_host_0{}'.format(i) for i in range(1, 6)]
-                                    + ['group_two_and_three_host_0{}'.format(i) for i in range(1, 6)]
-                                    + ['group_one_two_and_three_host_0{}'.format(i) for i in range(1, 6)],
-                             'vars': {'is_in_group_three': True}},
-             'all': {'vars': {'ansible_connection': 'local',
-                              'inventories_var': True}},
-             'ungrouped': {'hosts': ['ungrouped_host_0{}'.format(i) for i in range(1, 6)]}}
-
-hostvars = {'group_one_host_01': {'group_one_host_01_has_this_var': True},
-            'group_two_host_01': {'group_two_host_01_has_this_var': True},
-            'group_three_host_01': {'group_three_host_01_has_this_var': True}}
+# METALESS_INVENTORY_MODE selects how host variables are served:
+#   metaless (default) - no _meta, ansible forks this script once per host with --host
+#   cached             - no _meta, but --host answers from an on-disk cache of every host's vars
+#   meta               - --list includes _meta.hostvars, so ansible never calls --host
+# --hostvars [HOST ...] writes the vars of the given hosts (or of all hosts) in one invocation.
+MODE = os.environ.get('METALESS_INVENTORY_MODE', 'metaless')
+# the cache is per user, a shared path would let another user's file answer --host
+CACHE_PATH = os.environ.get('METALESS_INVENTORY_CACHE', os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'metaless_dyn_inventory.cache.json'))
+CACHE_TTL = float(os.environ.get('METALESS_INVENTORY_CACHE_TTL', 300))
+
+
+def build_inventory():
+    return {'group_one': {'hosts': ['group_one_host_0{}'.format(i) for i in range(1, 6)]
+                                   + ['group_one_and_two_host_0{}'.format(i) for i in range(1, 6)]
+                                   + ['group_one_two_and_three_host_0{}'.format(i) for i in range(1, 6)],
+                          'vars': {'is_in_group_one': True,
+                                   'complex_var': [{"dir": "/opt/gwaf/logs",
+                                                    "sourcetype": "gwaf",
+                                                    "something_else": [1, 2, 3]}]}},
+            'group_two': {'hosts': ['group_two_host_0{}'.format(i) for i in range(1, 6)]
+                                   + ['group_one_and_two_host_0{}'.format(i) for i in range(1, 6)]
+                                   + ['group_two_and_three_host_0{}'.format(i) for i in range(1, 6)]
+                                   + ['group_one_two_and_three_host_0{}'.format(i) for i in range(1, 6)],
+                          'vars': {'is_in_group_two': True}},
+            'group_three': {'hosts': ['group_three_host_0{}'.format(i) for i in range(1, 6)]
+                                     + ['group_two_and_three_host_0{}'.format(i) for i in range(1, 6)]
+                                     + ['group_one_two_and_three_host_0{}'.format(i) for i in range(1, 6)],
+                            'vars': {'is_in_group_three': True}},
+            'all': {'vars': {'ansible_connection': 'local',
+                             'inventories_var': True}},
+            'ungrouped': {'hosts': ['ungrouped_host_0{}'.format(i) for i in range(1, 6)]}}
+
+
+def build_hostvars(inventory):
+    ''' vars for every host in the inventory, including the ones that have none '''
+    hostvars = dict((host, {}) for group in inventory.values() for host in group.get('hosts', []))
+    hostvars.update({'group_one_host_01': {'group_one_host_01_has_this_var': True},
+                     'group_two_host_01': {'group_two_host_01_has_this_var': True},
+                     'group_three_host_01': {'group_three_host_01_has_this_var': True}})
+    return hostvars
 
 
 def dumps(dct):
     return json.dumps(dct, sort_keys=True, indent=4, separators=(',', ': '))
 
 
+def read_cache():
+    ''' returns the cached hostvars, or None if the cache is missing, stale or from another script version '''
+    try:
+        with open(CACHE_PATH) as f:
+            if os.fstat(f.fileno()).st_uid != os.getuid():
+                return None
+            cache = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if cache.get('script_mtime') != os.stat(__file__).st_mtime:
+        return None
+    age = time.time() - cache.get('created', 0)
+    # a cache from the future is as untrustworthy as an old one
+    if age < 0 or age > CACHE_TTL:
+        return None
+    return cache.get('hostvars')
+
+
+def write_cache(hostvars):
+    ''' writes the cache, or leaves it alone if it cannot be replaced, the caller already has its hostvars '''
+    cache = {'script_mtime': os.stat(__file__).st_mtime, 'created': time.time(), 'hostvars': hostvars}
+    cache_dir = os.path.dirname(CACHE_PATH) or '.'
+    tmp_path = None
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cache, f)
+        os.rename(tmp_path, CACHE_PATH)
+    except (IOError, OSError):
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def cached_hostvars():
+    hostvars = read_cache()
+    if hostvars is None:
+        hostvars = build_hostvars(build_inventory())
+        write_cache(hostvars)
+    return hostvars
+
+
 def parse_args():
     parser = ArgumentParser()
     parser.add_argument('--list', dest='list_instances', action='store_true', default=True,
                         help='List instances (default: True)')
     parser.add_argument('--host', dest='requested_host', help='Get all the variables about a specific instance')
+    parser.add_argument('--hostvars', dest='requested_hosts', nargs='*',
+                        help='Get the variables of the given instances, or of all instances if none are given')
     return parser.parse_args()
 
 
 def load_inventory():
+    # cached lookups skip argparse and the inventory build entirely
+    if MODE == 'cached' and len(sys.argv) == 3 and sys.argv[1] == '--host':
+        print(dumps(cached_hostvars().get(sys.argv[2], {})))
+        return
+
     args = parse_args()
-    if args.requested_host:
-        print(dumps(hostvars.get(args.requested_host, {})))
+    if args.requested_hosts is not None:
+        hostvars = cached_hostvars() if MODE == 'cached' else build_hostvars(build_inventory())
+        if args.requested_hosts:
+            hostvars = dict((host, hostvars.get(host, {})) for host in args.requested_hosts)
+        print(dumps(hostvars))
+    elif args.requested_host:
+        print(dumps(build_hostvars(build_inventory()).get(args.requested_host, {})))
     elif args.list_instances:
+        inventory = build_inventory()
+        if MODE == 'meta':
+            inventory['_meta'] = {'hostvars': build_hostvars(inventory)}
+        elif MODE == 'cached':
+            write_cache(build_hostvars(inventory))
         print(dumps(inventory))
     else:
         print({})
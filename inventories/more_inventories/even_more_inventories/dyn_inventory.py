@@ -1,6 +1,15 @@
 #!/usr/bin/env python
-from argparse import ArgumentParser
-from pprint import pprint
+import os
+import sys
+
+# the --list/--host handling and the scale mode are shared with the other dyn_inventory.py scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, os.pardir, os.pardir, 'utils'))
+from dyn_inventory_scale import load_inventory  # noqa: E402
+
+# Scale mode replaces the static inventory below with N groups x M hosts following
+# the same overlap pattern, e.g. DYN_INVENTORY_GROUPS=100 DYN_INVENTORY_HOSTS=500
+# (about 100k hosts).  Output is streamed, so memory stays flat as hosts grow.
+SCALE_PREFIX = 'even_more_scale'
 
 inventory = {'group_seven': {'hosts': ['group_seven_host_0{}'.format(i) for i in range(1, 6)]
                                     + ['group_seven_and_eight_host_0{}'.format(i) for i in range(1, 6)]
@@ -22,19 +31,6 @@ inventory = {'group_seven': {'hosts': ['group_seven_host_0{}'.format(i) for i in
                                     'group_eight_host_01': {'group_eight_host_01_has_this_var': True},
                                     'group_nine_host_01': {'group_nine_host_01_has_this_var': True}}}}
 
-def parse_args():
-    parser = ArgumentParser()
-    parser.add_argument('--list', dest='list_instances', action='store_true', default=True,
-                        help='List instances (default: True)')
-    parser.add_argument('--host', dest='requested_host', help='Get all the variables about a specific instance')
-    return parser.parse_args()
-
-
-def load_inventory():
-    args = parse_args()
-    if args.list_instances:
-        pprint(inventory)
-
 
 if __name__ == '__main__':
-    load_inventory()
+    load_inventory(inventory, SCALE_PREFIX)
@@ -0,0 +1,242 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+    inventory: aggregate
+    version_added: "2.7"
+    short_description: Parse several inventory sources at once and merge them in order
+    description:
+        - Parses every source in C(sources) with the enabled inventory plugins, like C(-i) would,
+          but runs up to C(workers) of them at the same time instead of one after another.
+        - Each source is parsed into an inventory of its own, and the inventories are merged
+          in the order of C(sources) once all of them are done, so the result does not depend
+          on which source finished first.
+        - A source that fails, or does not finish within its timeout, never leaves partial hosts
+          or groups behind. With C(on_error=skip) it is left out with a warning, with
+          C(on_error=fail) the whole aggregate fails and nothing at all is added.
+        - A source that times out is abandoned, not killed, and whatever it returns later is discarded.
+        - The time each source took is shown with C(-v).
+        - Ansible only runs the vars plugins, e.g. group_vars and host_vars, next to this file. So once
+          the sources are merged, they are run next to each source that was parsed, in order, and their
+          vars are set on all hosts and groups, as with each source passed to C(-i).
+          As inventory vars, group_vars/all does not take precedence over the sources' own vars of
+          other groups.
+    options:
+        plugin:
+            description: token that ensures this is a source file for the 'aggregate' plugin.
+            required: True
+            choices: ['aggregate']
+        sources:
+            description:
+                - Inventory sources, relative to this file. Each item is a path, or a dict with
+                  C(path) and optionally C(timeout) overriding the default one.
+            type: list
+            required: True
+        workers:
+            description: Number of sources parsed at the same time.
+            type: int
+            default: 4
+        timeout:
+            description: Seconds each source may take, 0 for no limit.
+            type: float
+            default: 60
+        on_error:
+            description: What to do when a source fails or times out.
+            choices: ['skip', 'fail']
+            default: skip
+'''
+
+EXAMPLES = r'''
+    # aggregate.yaml
+    plugin: aggregate
+    workers: 3
+    on_error: skip
+    sources:
+      - ../dyn_inventory.py
+      - ../more_inventories/dyn_inventory.py
+      - path: fox.yaml
+        timeout: 5
+'''
+
+import os
+import threading
+import time
+from collections import deque
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from ansible import constants as C
+from ansible.errors import AnsibleError, AnsibleParserError
+from ansible.inventory.data import InventoryData
+from ansible.module_utils.common.text.converters import to_native
+from ansible.plugins.inventory import BaseInventoryPlugin
+from ansible.plugins.loader import inventory_loader
+from ansible.vars.plugins import get_vars_from_path
+
+try:
+    # applies the template trust each plugin asks for, as the inventory manager does
+    from ansible.inventory.manager import _InventoryDataWrapper
+    from ansible._internal._datatag._tags import Origin
+except ImportError:
+    _InventoryDataWrapper = None
+
+# host vars that belong to the first source a host was found in
+FIRST_SOURCE_VARS = ('inventory_file', 'inventory_dir')
+
+# vars plugins that run on demand would run at task time, which only searches next to the aggregate file
+VARS_STAGE = 'inventory' if C.RUN_VARS_PLUGINS == 'start' else 'task'
+
+
+class InventoryModule(BaseInventoryPlugin):
+
+    NAME = 'aggregate'
+
+    def verify_file(self, path):
+        return super(InventoryModule, self).verify_file(path) and path.endswith(('aggregate.yaml', 'aggregate.yml'))
+
+    def parse_source(self, source):
+        ''' parses one source into an inventory of its own, with the first enabled plugin that accepts it '''
+        inventory = InventoryData()
+        inventory.current_source = source
+        failures = []
+        for plugin_name in C.INVENTORY_ENABLED:
+            plugin = inventory_loader.get(plugin_name)
+            if plugin is None or getattr(plugin, 'NAME', None) == self.NAME:
+                continue
+            try:
+                if not plugin.verify_file(source):
+                    continue
+            except Exception:
+                continue
+            target = inventory
+            if _InventoryDataWrapper is not None:
+                origin = Origin(description='<inventory plugin %r with source %r>' % (plugin_name, source))
+                target = _InventoryDataWrapper(inventory, target_plugin=plugin, origin=origin)
+            try:
+                plugin.parse(target, self.loader, source, cache=False)
+                try:
+                    plugin.update_cache_if_changed()
+                except AttributeError:
+                    pass
+                return inventory
+            except Exception as e:
+                failures.append('%s: %s' % (plugin_name, to_native(e)))
+                # whatever the failed plugin added is thrown away with its inventory
+                inventory = InventoryData()
+                inventory.current_source = source
+        raise AnsibleError('no inventory plugin could parse %s%s' % (source, ''.join('\n  ' + f for f in failures)))
+
+    def _run(self, index, source, done):
+        started = time.time()
+        try:
+            outcome = (True, self.parse_source(source))
+        except Exception as e:
+            outcome = (False, to_native(e))
+        done.put((index, outcome, time.time() - started))
+
+    def parse_all(self, sources):
+        ''' parses (path, timeout) sources concurrently, returns (ok, inventory or error, seconds) for each, in order '''
+        results = [None] * len(sources)
+        pending = deque(range(len(sources)))
+        running = {}
+        done = queue.Queue()
+        workers = max(self.get_option('workers'), 1)
+        while pending or running:
+            while pending and len(running) < workers:
+                index = pending.popleft()
+                # daemon threads, so a source that never returns cannot hold up the exit
+                thread = threading.Thread(target=self._run, args=(index, sources[index][0], done),
+                                          name='aggregate-%d' % index)
+                thread.daemon = True
+                running[index] = time.time()
+                thread.start()
+
+            deadlines = [started + sources[index][1] for index, started in running.items() if sources[index][1]]
+            try:
+                wait = max(min(deadlines) - time.time(), 0) if deadlines else None
+                index, outcome, elapsed = done.get(timeout=wait)
+                if index in running:
+                    del running[index]
+                    results[index] = outcome + (elapsed,)
+            except queue.Empty:
+                pass
+
+            now = time.time()
+            for index, started in list(running.items()):
+                timeout = sources[index][1]
+                if timeout and now - started >= timeout:
+                    del running[index]
+                    results[index] = (False, 'timed out after %ss' % timeout, now - started)
+        return results
+
+    def load_adjacent_vars(self, sources):
+        ''' sets the vars the vars plugins find next to each source on all hosts and groups, later sources win '''
+        paths = []
+        for source in sources:
+            path = source if os.path.isdir(source) else os.path.dirname(source)
+            # ansible loads the ones next to this file itself
+            if path != self._basedir and path not in paths:
+                paths.append(path)
+        entities = list(self.inventory.groups.values()) + list(self.inventory.hosts.values())
+        for path in paths:
+            for entity in entities:
+                for varname, value in get_vars_from_path(self.loader, path, [entity], VARS_STAGE).items():
+                    self.inventory.set_variable(entity.name, varname, value)
+
+    def merge(self, source_inventory):
+        ''' adds the groups, hosts and vars of one parsed source in the order the source added them '''
+        known = set(self.inventory.hosts)
+        for group in source_inventory.groups.values():
+            self.inventory.add_group(group.name)
+            for host in group.hosts:
+                self.inventory.add_host(host.name, group=group.name)
+            for varname, value in group.vars.items():
+                self.inventory.set_variable(group.name, varname, value)
+            for child in group.child_groups:
+                self.inventory.add_group(child.name)
+                self.inventory.add_child(group.name, child.name)
+        for host in source_inventory.hosts.values():
+            self.inventory.add_host(host.name)
+            for varname, value in host.vars.items():
+                # later sources win on conflicting vars, except where the host was first found
+                if not (host.name in known and varname in FIRST_SOURCE_VARS):
+                    self.inventory.set_variable(host.name, varname, value)
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path)
+        self._read_config_data(path)
+
+        basedir = self._basedir = os.path.dirname(os.path.abspath(path))
+        sources = []
+        for item in self.get_option('sources'):
+            if not isinstance(item, dict):
+                item = {'path': item}
+            if 'path' not in item:
+                raise AnsibleParserError('aggregate: every source needs a path, got %s' % item)
+            timeout = float(item.get('timeout', self.get_option('timeout')))
+            sources.append((os.path.normpath(os.path.join(basedir, os.path.expanduser(item['path']))), timeout))
+
+        started = time.time()
+        results = self.parse_all(sources)
+        for (source, timeout), (ok, result, elapsed) in zip(sources, results):
+            if ok:
+                self.display.v('aggregate: parsed %s in %.2fs, %d hosts' % (source, elapsed, len(result.hosts)))
+            else:
+                self.display.v('aggregate: failed %s in %.2fs' % (source, elapsed))
+
+        failed = [(source, result) for (source, timeout), (ok, result, elapsed) in zip(sources, results) if not ok]
+        if failed and self.get_option('on_error') == 'fail':
+            raise AnsibleParserError('aggregate: %d of %d sources failed, nothing was added:%s' % (
+                len(failed), len(sources), ''.join('\n%s: %s' % f for f in failed)))
+        for source, error in failed:
+            self.display.warning('aggregate: skipping %s: %s' % (source, error))
+
+        for ok, result, elapsed in results:
+            if ok:
+                self.merge(result)
+        self.load_adjacent_vars([source for (source, timeout), result in zip(sources, results) if result[0]])
+        self.display.v('aggregate: %d sources in %.2fs, %.2fs if run one after another' % (
+            len(sources), time.time() - started, sum(result[2] for result in results)))
@@ -0,0 +1,117 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+    inventory: herd
+    version_added: "2.7"
+    short_description: A whole herd of cows, for measuring inventory updates at scale
+    description:
+        - Generates a deterministic synthetic inventory of hosts, groups, host vars and group vars.
+        - Every host belongs to C(groups_per_host) groups, spread evenly over C(groups) groups.
+        - With C(cache) enabled, a second parse within C(cache_timeout) skips generation and
+          loads the herd from the configured cache plugin.
+    options:
+        plugin:
+            description: token that ensures this is a source file for the 'herd' plugin.
+            required: True
+            choices: ['herd']
+        hosts:
+            description: Number of hosts to generate.
+            type: int
+            default: 10000
+        groups:
+            description: Number of groups to spread the hosts over.
+            type: int
+            default: 100
+        groups_per_host:
+            description: Number of groups each host belongs to, at least 1.
+            type: int
+            default: 2
+        host_vars:
+            description: Number of variables set on each host.
+            type: int
+            default: 5
+        group_vars:
+            description: Number of variables set on each group.
+            type: int
+            default: 5
+    extends_documentation_fragment:
+        - inventory_cache
+'''
+
+EXAMPLES = r'''
+    # herd.yaml
+    plugin: herd
+    hosts: 50000
+    groups: 500
+    cache: true
+    cache_plugin: jsonfile
+    cache_connection: /tmp/herd_inventory_cache
+'''
+
+from ansible.errors import AnsibleParserError
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable
+
+
+class InventoryModule(BaseInventoryPlugin, Cacheable):
+
+    NAME = 'herd'
+
+    def verify_file(self, path):
+        return super(InventoryModule, self).verify_file(path) and path.endswith(('herd.yaml', 'herd.yml'))
+
+    def generate(self):
+        ''' the herd as plain data, so it can be stored by any cache plugin '''
+        num_hosts = self.get_option('hosts')
+        num_groups = max(self.get_option('groups'), 1)
+        if self.get_option('groups_per_host') < 1:
+            raise AnsibleParserError('groups_per_host must be at least 1, got %d' % self.get_option('groups_per_host'))
+        groups_per_host = min(self.get_option('groups_per_host'), num_groups)
+        stride = max(num_groups // groups_per_host, 1)
+
+        groups = ['pasture_{:04d}'.format(g) for g in range(num_groups)]
+        group_vars = dict((group, dict(('{}_var_{}'.format(group, v), 'moo' * (v + 1))
+                                       for v in range(self.get_option('group_vars'))))
+                          for group in groups)
+        hosts = {}
+        for h in range(num_hosts):
+            hosts['cow_{:06d}'.format(h)] = {
+                'groups': [groups[(h + g * stride) % num_groups] for g in range(groups_per_host)],
+                'vars': dict(('cow_var_{}'.format(v), h * v) for v in range(self.get_option('host_vars'))),
+            }
+        return {'group_vars': group_vars, 'hosts': hosts}
+
+    def populate(self, herd):
+        add_group, add_host, set_variable = self.inventory.add_group, self.inventory.add_host, self.inventory.set_variable
+        for group, variables in herd['group_vars'].items():
+            add_group(group)
+            for name, value in variables.items():
+                set_variable(group, name, value)
+        for host, data in herd['hosts'].items():
+            for group in data['groups']:
+                add_host(host, group=group)
+            for name, value in data['vars'].items():
+                set_variable(host, name, value)
+
+    def parse(self, inventory, loader, path, cache=True):
+        ''' generates the herd, or reuses the cached one '''
+        super(InventoryModule, self).parse(inventory, loader, path)
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        user_cache_setting = self.get_option('cache')
+        attempt_to_read_cache = user_cache_setting and cache
+        cache_needs_update = user_cache_setting and not cache
+
+        herd = None
+        if attempt_to_read_cache:
+            try:
+                herd = self._cache[cache_key]
+            except KeyError:
+                cache_needs_update = True
+        if herd is None:
+            herd = self.generate()
+        if cache_needs_update:
+            self._cache[cache_key] = herd
+
+        self.populate(herd)
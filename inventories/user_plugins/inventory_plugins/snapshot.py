@@ -0,0 +1,211 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+    inventory: snapshot
+    version_added: "2.7"
+    short_description: Loads compact inventory snapshots, creating only the hosts that are needed
+    description:
+        - Loads snapshots written by utils/export_inventory_snapshot.py, where runs of numbered
+          hosts are kept as ranges and group vars are kept on their groups.
+        - By default every host is created, and the snapshot gives the same inventory as the source
+          it was exported from.
+        - With C(narrow_limit) and C(--limit), only hosts the limit can select are created, so a run
+          limited to a few hosts of a huge snapshot does not pay for the rest of them.
+        - Groups and group vars are always created.
+    options:
+        plugin:
+            description: token that ensures this is a source file for the 'snapshot' plugin.
+            required: True
+            choices: ['snapshot']
+        narrow_limit:
+            description:
+                - Create only the hosts that C(--limit) can select. Without a limit, or with a limit
+                  this plugin cannot narrow down, every host is created.
+                - This changes what the play sees. The hosts the limit leaves out are not in the
+                  inventory at all, so they are missing from C(groups) and C(hostvars), and cannot be
+                  used with C(delegate_to). Under C(--limit group_one_host_03), C(groups['all']) has
+                  one host instead of every host in the snapshot.
+                - C(ansible-inventory --list --limit) gives the same output either way, because it only
+                  shows the hosts the limit selects.
+            type: bool
+            default: False
+            env:
+                - name: SNAPSHOT_NARROW_LIMIT
+            ini:
+                - section: inventory_plugin_snapshot
+                  key: narrow_limit
+'''
+
+EXAMPLES = r'''
+    # utils/export_inventory_snapshot.py -i inventories/inventory.ini -o inventory.snapshot.json
+    # ansible-playbook -i inventory.snapshot.json --limit group_one_host_03 debug.yml
+    # SNAPSHOT_NARROW_LIMIT=True ansible-playbook -i inventory.snapshot.json --limit group_one_host_03 debug.yml
+'''
+
+import fnmatch
+import json
+import re
+from bisect import bisect_left, bisect_right
+
+from ansible import context
+from ansible.errors import AnsibleParserError
+from ansible.inventory.manager import split_host_pattern
+from ansible.module_utils.common.text.converters import to_native, to_text
+from ansible.plugins.inventory import BaseInventoryPlugin
+
+try:
+    from ansible._internal._datatag._tags import Origin, TrustedAsTemplate
+    from ansible._internal._json._profiles._inventory_legacy import Decoder
+except ImportError:
+    Decoder = None
+
+SNAPSHOT_VERSION = 1
+
+NUMBERED = re.compile(r'^(.*?)(\d+)(\D*)$')
+PATTERN_CHARS = re.compile(r'[*?]')
+
+
+def expand(entries):
+    ''' host names of snapshot host entries, in order '''
+    for entry in entries:
+        if isinstance(entry, list):
+            prefix, first, last, width, suffix = entry
+            for number in range(first, last + 1):
+                yield '%s%0*d%s' % (prefix, width, number, suffix)
+        else:
+            yield entry
+
+
+def index_names(names):
+    ''' host names split up for select(), numbered ones by (prefix, width, suffix) '''
+    numbered = {}
+    for name in names:
+        match = NUMBERED.match(name)
+        if match:
+            numbered.setdefault((match.group(1), len(match.group(2)), match.group(3)), []).append(int(match.group(2)))
+    for numbers in numbered.values():
+        numbers.sort()
+    return numbered, set(names)
+
+
+def select(entries, index):
+    ''' the host names of snapshot host entries that are in index, in order, without expanding the ranges '''
+    numbered, names = index
+    for entry in entries:
+        if isinstance(entry, list):
+            prefix, first, last, width, suffix = entry
+            numbers = numbered.get((prefix, width, suffix), [])
+            for number in numbers[bisect_left(numbers, first):bisect_right(numbers, last)]:
+                yield '%s%0*d%s' % (prefix, width, number, suffix)
+        elif entry in names:
+            yield entry
+
+
+class InventoryModule(BaseInventoryPlugin):
+
+    NAME = 'snapshot'
+
+    # the snapshot holds what trusted inventory sources already returned
+    trusted_by_default = True
+
+    def verify_file(self, path):
+        return super(InventoryModule, self).verify_file(path) and path.endswith(('.snapshot.json', '.snapshot'))
+
+    def _load(self, path):
+        with open(path, 'rb') as f:
+            text = to_text(f.read())
+        try:
+            if Decoder is None:
+                return json.loads(text)
+            return json.loads(TrustedAsTemplate().tag(Origin(path=path).tag(text)), cls=Decoder)
+        except ValueError as e:
+            raise AnsibleParserError('%s is not a valid inventory snapshot: %s' % (path, to_native(e)))
+
+    def _wanted(self, groups, limit):
+        ''' (group names, host names) the limit can select, or None when every host may be needed '''
+        terms = []
+        for term in split_host_pattern(limit):
+            if term.startswith('@'):
+                with open(term[1:]) as f:
+                    terms.extend(line.strip() for line in f if line.strip())
+            else:
+                terms.append(term)
+
+        if all(term.startswith(('!', '&')) for term in terms):
+            # ansible starts from all when there is nothing but exclusions and intersections
+            return None
+
+        wanted_groups, wanted_hosts, matchers = set(), set(), []
+        for term in terms:
+            if term.startswith(('!', '&')):
+                # exclusions and intersections only ever narrow the selection down further
+                continue
+            if term in ('all', '*'):
+                return None
+            if term.startswith('~'):
+                pattern = re.compile(term[1:])
+                matchers.append(pattern.search)
+            elif '[' in term:
+                # subscripts like group[0:2] depend on the order of the whole group
+                return None
+            elif PATTERN_CHARS.search(term):
+                matchers.append(lambda name, term=term: fnmatch.fnmatch(name, term))
+            elif term in groups:
+                wanted_groups.add(term)
+            else:
+                wanted_hosts.add(term)
+
+        for matches in matchers:
+            wanted_groups.update(name for name in groups if matches(name))
+            for group in groups.values():
+                wanted_hosts.update(name for name in expand(group['hosts']) if matches(name))
+
+        # a group brings all of its descendants' hosts with it
+        pending = list(wanted_groups)
+        while pending:
+            for child in groups[pending.pop()]['children']:
+                if child not in wanted_groups:
+                    wanted_groups.add(child)
+                    pending.append(child)
+        for name in wanted_groups:
+            wanted_hosts.update(expand(groups[name]['hosts']))
+        return wanted_groups, wanted_hosts
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path)
+
+        data = self._load(path)
+        if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION:
+            raise AnsibleParserError('%s is not a version %d inventory snapshot' % (path, SNAPSHOT_VERSION))
+        # the rest of the options come from the environment and ansible.cfg, the snapshot is not a config file
+        self.set_options(direct={'plugin': data.get('plugin')})
+        groups = data['groups']
+        hostvars = data.get('hostvars', {})
+
+        limit = context.CLIARGS.get('subset')
+        wanted = self._wanted(groups, limit) if limit and self.get_option('narrow_limit') else None
+        if wanted is not None:
+            self.display.vvv('snapshot: --limit %s narrowed %s to %d groups and %d hosts'
+                             % (limit, path, len(wanted[0]), len(wanted[1])))
+
+        for name, group in groups.items():
+            self.inventory.add_group(name)
+            for varname, value in group['vars'].items():
+                self.inventory.set_variable(name, varname, value)
+
+        selected = index_names(wanted[1]) if wanted is not None else None
+        for name, group in groups.items():
+            # wanted hosts are added to every group they are in, so exclusions and intersections still work
+            if wanted is None or name in wanted[0]:
+                names = expand(group['hosts'])
+            else:
+                names = select(group['hosts'], selected)
+            for host in names:
+                new = host not in self.inventory.hosts
+                self.inventory.add_host(host, group=name)
+                if new:
+                    for varname, value in hostvars.get(host, {}).items():
+                        self.inventory.set_variable(host, varname, value)
+            for child in group['children']:
+                self.inventory.add_child(name, child)
@@ -0,0 +1,143 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+DOCUMENTATION = '''
+---
+module: async_wait
+short_description: Wait for many async jobs in one module run.
+description:
+    - Polls the result files of a list of async jobs with adaptive backoff, and returns
+      as soon as all of them finished or C(timeout) passed.
+    - Meant to be called through the async_wait action plugin, which passes C(_async_dir)
+      and makes each result look like the output of M(async_status).
+version_added: "2.8"
+options:
+    jids:
+        description: Async job ids, e.g. the C(ansible_job_id) of tasks run with C(poll: 0).
+        required: true
+        type: list
+    timeout:
+        description: Seconds to wait for all jobs before giving up.
+        default: 300
+    delay:
+        description: Seconds between the first polls, grows by C(backoff) while no job finishes.
+        default: 0.5
+    max_delay:
+        description: Upper bound of the delay between polls.
+        default: 5
+    backoff:
+        description: Factor the delay grows by after each poll in which no job finished.
+        default: 1.5
+    cleanup:
+        description: Remove the result files of finished jobs.
+        type: bool
+        default: false
+requirements: []
+'''
+
+EXAMPLES = '''
+- shell: sleep {{ item }}
+  async: 60
+  poll: 0
+  register: fired
+  with_sequence: count=10
+
+- async_wait:
+    jids: "{{ fired.results | map(attribute='ansible_job_id') | list }}"
+    timeout: 60
+'''
+
+import errno
+import json
+import os
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+
+
+def job_status(async_dir, jid):
+    ''' same answer as async_status in status mode '''
+    log_path = os.path.join(async_dir, jid)
+    if not os.path.exists(log_path):
+        return dict(msg='could not find job', failed=True, ansible_job_id=jid, started=True, finished=True)
+
+    data = None
+    try:
+        with open(log_path) as f:
+            data = json.loads(f.read())
+    except Exception:
+        if not data:
+            # file not written yet, so the job is still running
+            return dict(results_file=log_path, ansible_job_id=jid, started=True, finished=False)
+        return dict(msg='Could not parse job output: %s' % data, failed=True,
+                    ansible_job_id=jid, results_file=log_path, started=True, finished=True)
+
+    if 'started' not in data:
+        data['finished'] = True
+        data['ansible_job_id'] = jid
+    elif 'finished' not in data:
+        data['finished'] = False
+    return data
+
+
+def remove_results(async_dir, jid):
+    ''' removes a finished job's results file, jobs that could not be found have none '''
+    try:
+        os.unlink(os.path.join(async_dir, jid))
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            jids=dict(type='list', required=True),
+            timeout=dict(type='float', default=300),
+            delay=dict(type='float', default=0.5),
+            max_delay=dict(type='float', default=5),
+            backoff=dict(type='float', default=1.5),
+            cleanup=dict(type='bool', default=False),
+            # passed in from the async_wait action plugin
+            _async_dir=dict(type='path', required=True),
+        ),
+        supports_check_mode=True)
+
+    async_dir = module.params['_async_dir']
+    jids = [str(jid) for jid in module.params['jids']]
+    deadline = time.time() + module.params['timeout']
+    delay = module.params['delay']
+
+    jobs = {}
+    pending = list(jids)
+    polls = 0
+    while True:
+        polls += 1
+        still_pending = []
+        for jid in pending:
+            status = job_status(async_dir, jid)
+            if status.get('finished'):
+                jobs[jid] = status
+                if module.params['cleanup'] and not module.check_mode and 'results_file' not in status:
+                    remove_results(async_dir, jid)
+            else:
+                jobs[jid] = status
+                still_pending.append(jid)
+
+        remaining = deadline - time.time()
+        if not still_pending or remaining <= 0:
+            pending = still_pending
+            break
+        # poll quickly while jobs are finishing, back off while they are not
+        if len(still_pending) < len(pending):
+            delay = module.params['delay']
+        else:
+            delay = min(delay * module.params['backoff'], module.params['max_delay'])
+        pending = still_pending
+        time.sleep(min(delay, remaining))
+
+    module.exit_json(changed=False, results=[jobs[jid] for jid in jids], pending=pending, polls=polls)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+DOCUMENTATION = '''
+---
+module: bulk_file
+short_description: Manage many files and directories in one module run.
+description:
+    - Applies C(state) and C(mode) to a whole list of paths in a single remote process,
+      instead of one M(file) run per path.
+    - Usually called through the bulk_file action plugin, which normalizes C(paths).
+version_added: "2.8"
+options:
+    paths:
+        description:
+            - Paths to manage. Each item is a path, or a dict with C(path) and optionally
+              C(state) and C(mode) overriding the task level values.
+        required: true
+        type: list
+    state:
+        description: Default state of each path.
+        choices: [directory, touch, absent]
+        default: directory
+    mode:
+        description: Default mode of each path, as for M(file).
+requirements: []
+'''
+
+EXAMPLES = '''
+- bulk_file:
+    state: directory
+    mode: 0o0700
+    paths:
+      - /opt/test/one
+      - path: /opt/test/two
+        mode: 0o0755
+'''
+
+RETURN = '''
+results:
+    description: One entry per path, in order, with C(path), C(changed) and, on failure, C(failed) and C(msg).
+    type: list
+'''
+
+import os
+import shutil
+
+from ansible.module_utils.basic import AnsibleModule
+
+
+def ensure_path(module, path, state, mode):
+    result = {'path': path, 'changed': False}
+    try:
+        if state == 'absent':
+            if os.path.lexists(path):
+                if not module.check_mode:
+                    if os.path.isdir(path) and not os.path.islink(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
+                result['changed'] = True
+            return result
+
+        if state == 'directory' and not os.path.isdir(path):
+            if not module.check_mode:
+                try:
+                    os.makedirs(path)
+                except OSError:
+                    # several local hosts may race to create the same path
+                    if not os.path.isdir(path):
+                        raise
+            result['changed'] = True
+        elif state == 'touch':
+            if not module.check_mode:
+                open(path, 'a').close()
+                os.utime(path, None)
+            result['changed'] = True
+
+        if mode is not None and os.path.lexists(path):
+            result['changed'] = module.set_mode_if_different(path, mode, result['changed'])
+    except (IOError, OSError) as e:
+        result.update(failed=True, msg='{0}: {1}'.format(path, e))
+    return result
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            paths=dict(type='list', required=True),
+            state=dict(choices=['directory', 'touch', 'absent'], default='directory'),
+            mode=dict(type='raw'),
+        ),
+        supports_check_mode=True)
+
+    results = []
+    for item in module.params['paths']:
+        if not isinstance(item, dict):
+            item = {'path': item}
+        results.append(ensure_path(module, os.path.expanduser(item['path']),
+                                   item.get('state', module.params['state']),
+                                   item.get('mode', module.params['mode'])))
+
+    failed = [result for result in results if result.get('failed')]
+    changed = any(result['changed'] for result in results)
+    if failed:
+        module.fail_json(msg='{0} of {1} paths failed'.format(len(failed), len(results)),
+                         changed=changed, results=results)
+    module.exit_json(changed=changed, results=results)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import os
+import json
+import random
+import sys
 
-from ansible.module_utils.basic import * # noqa
+from ansible.module_utils.basic import AnsibleModule
 
 DOCUMENTATION = '''
 ---
@@ -11,8 +13,29 @@ module: scan_facts
 short_description: Return sample facts into facts namespace.
 description:
     - Return sample facts into facts namespace.
+    - With C(payload_kb) set, also returns a deterministic C(payload) fact of about that size,
+      which is written to stdout as it is generated instead of being built in memory first.
 version_added: "2.3"
 options:
+    payload_kb:
+        description: Approximate size of the generated C(payload) fact in KiB, 0 for none.
+        default: 0
+    depth:
+        description: Nesting depth of each item in the payload.
+        default: 3
+    list_length:
+        description: Number of strings in the list at the bottom of each item.
+        default: 10
+    unicode_ratio:
+        description: Fraction of the characters in payload strings that are non-ASCII.
+        default: 0.1
+    seed:
+        description: Seed for the payload, the same seed always gives the same payload.
+        default: 0
+notes:
+    - With C(payload_kb) set, the result is written without C(exit_json), so no_log censoring, warnings and
+      deprecations are not processed, and C(invocation) holds the module arguments as given. Without it the
+      module exits through C(exit_json) as usual.
 requirements: []
 author: Chris Meyers, Christopher Wang
 '''
@@ -44,9 +67,79 @@ EXAMPLES = '''
 }
 '''
 
+UNICODE_CHARS = u"鵟犭酜귃ꔀꈛ竳䙭韽ࠔ"
+
+
+def random_string(rand, unicode_ratio):
+    return u''.join(rand.choice(UNICODE_CHARS) if rand.random() < unicode_ratio else rand.choice('abcdefghijklmnop')
+                    for i in range(rand.randint(16, 32)))
+
+
+def payload_item(rand, depth, list_length, unicode_ratio):
+    ''' yields the JSON text of one payload item '''
+    if depth <= 0:
+        yield json.dumps([random_string(rand, unicode_ratio) for i in range(list_length)], ensure_ascii=False)
+        return
+    yield u'{"id": %d, "name": %s, "nested": ' % (rand.getrandbits(32),
+                                                  json.dumps(random_string(rand, unicode_ratio), ensure_ascii=False))
+    for chunk in payload_item(rand, depth - 1, list_length, unicode_ratio):
+        yield chunk
+    yield u'}'
+
+
+def payload_chunks(size, seed, depth, list_length, unicode_ratio):
+    ''' yields the JSON text of a payload object of about size bytes, one item at a time '''
+    rand = random.Random(seed)
+    written = 0
+    index = 0
+    yield u'{'
+    while written < size:
+        key = u'%s"item_%06d": ' % (u', ' if index else u'', index)
+        written += len(key)
+        yield key
+        for chunk in payload_item(rand, depth, list_length, unicode_ratio):
+            written += len(chunk.encode('utf-8'))
+            yield chunk
+        index += 1
+    yield u'}'
+
+
+def exit_with_payload(module, facts):
+    ''' like exit_json, but with the payload fact streamed to stdout as it is generated
+
+    exit_json is skipped, so none of its processing of the result happens: no_log values are not censored, and
+    warnings and deprecations are not added.
+    '''
+    params = module.params
+    # everything but the payload is ordinary JSON, left open so the payload can follow it
+    head = json.dumps(dict(changed=False, invocation=dict(module_args=params)))[:-1]
+    facts = json.dumps(facts, ensure_ascii=False)[:-1]
+    out = getattr(sys.stdout, 'buffer', sys.stdout)
+    out.write(u'\n{0}, "ansible_facts": {1}, "payload": '.format(head, facts).encode('utf-8'))
+    buf = []
+    size = 0
+    for chunk in payload_chunks(params['payload_kb'] * 1024, params['seed'], params['depth'],
+                                params['list_length'], params['unicode_ratio']):
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= 65536:
+            out.write(u''.join(buf).encode('utf-8'))
+            buf = []
+            size = 0
+    buf.append(u'}}\n')
+    out.write(u''.join(buf).encode('utf-8'))
+    out.flush()
+    sys.exit(0)
+
+
 def main():
     module = AnsibleModule(
-        argument_spec = dict())
+        argument_spec = dict(
+            payload_kb=dict(type='int', default=0),
+            depth=dict(type='int', default=3),
+            list_length=dict(type='int', default=10),
+            unicode_ratio=dict(type='float', default=0.1),
+            seed=dict(type='raw', default=0)))
 
     string="abc"
     unicode_string="鵟犭酜귃ꔀꈛ竳䙭韽ࠔ"
@@ -67,6 +160,10 @@ def main():
 
     results = dict(ansible_facts=dict(string=string, unicode_string=unicode_string, int=int, float=float, bool=bool,
                                       null=null, list=list, obj=obj, empty_list=empty_list, empty_obj=empty_obj))
+    if module.params['payload_kb'] > 0:
+        exit_with_payload(module, results['ansible_facts'])
     module.exit_json(**results)
 
-main()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    strategy: local_threads
+    short_description: linear, but action-only tasks on local hosts run in threads instead of forked workers
+    description:
+        - Behaves like the linear strategy, except that tasks whose action never runs a module
+          (set_fact, debug, assert, fail) on hosts with C(ansible_connection=local) are executed by
+          a thread pool inside the controller, which saves a worker fork per host and task.
+        - Every other task falls back to the normal forked workers.
+        - The thread pool has as many threads as there are forks, or C(ANSIBLE_LOCAL_THREADS) if set.
+        - Each threaded task runs in a TaskContext, as in a worker. Loading a plugin module is serialized
+          across threads, because the plugin loader makes a module visible before it has finished executing.
+        - See local_threads_free for the same on top of the free strategy.
+    version_added: "2.19"
+    notes:
+        - Written against the ansible-core 2.19 TaskExecutor and task result API.
+'''
+
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible._internal._task import TaskContext
+from ansible.executor.task_executor import TaskExecutor
+from ansible.executor.task_result import _RawTaskResult
+from ansible.plugins import loader as plugin_loader
+from ansible.plugins.strategy.linear import StrategyModule as LinearStrategyModule
+from ansible.utils.display import Display
+
+display = Display()
+
+THREADED_ACTIONS = frozenset(prefix + action
+                             for prefix in ('', 'ansible.builtin.', 'ansible.legacy.')
+                             for action in ('set_fact', 'debug', 'assert', 'fail'))
+
+# reentrant, a plugin module can load other plugins while it is executed
+_plugin_load_lock = threading.RLock()
+
+
+def lock_plugin_loading():
+    ''' makes PluginLoader._load_module_source load one module at a time, idempotent
+
+    The loader puts a module in sys.modules before executing it, so a second thread loading the
+    same plugin gets the half executed module, e.g. one without its LookupModule yet.
+    '''
+    load = plugin_loader.PluginLoader._load_module_source
+    if getattr(load, '_local_threads_locked', False):
+        return
+
+    @functools.wraps(load)
+    def _load_module_source(self, *args, **kwargs):
+        with _plugin_load_lock:
+            return load(self, *args, **kwargs)
+    _load_module_source._local_threads_locked = True
+    plugin_loader.PluginLoader._load_module_source = _load_module_source
+
+
+class ThreadedLocalMixin(object):
+    ''' overrides _queue_task to run action-only tasks on local hosts in a thread pool '''
+
+    def __init__(self, tqm):
+        super(ThreadedLocalMixin, self).__init__(tqm)
+        self._thread_pool = None
+        lock_plugin_loading()
+
+    def _runs_in_thread(self, task, task_vars):
+        return (task.action in THREADED_ACTIONS
+                and not task.delegate_to
+                and task_vars.get('ansible_connection') == 'local')
+
+    def _run_in_thread(self, host, task, task_vars, play_context):
+        ''' the in-process equivalent of WorkerProcess.run '''
+        try:
+            # lookups such as first_found find the running task through it
+            with TaskContext(task):
+                return_data = TaskExecutor(host, task, task_vars, play_context, self._loader,
+                                           plugin_loader.get_plugin_loader_namespace(), self._final_q,
+                                           self._variable_manager).run()
+            task_fields = task.dump_attrs()
+        except Exception as e:
+            return_data = dict(failed=True, msg='local_threads: %s' % e)
+            task_fields = {}
+        self._final_q.send_task_result(_RawTaskResult(host=host, task=task, return_data=return_data,
+                                                      task_fields=task_fields))
+
+    def _queue_task(self, host, task, task_vars, play_context):
+        if not self._runs_in_thread(task, task_vars):
+            return super(ThreadedLocalMixin, self)._queue_task(host, task, task_vars, play_context)
+
+        if self._thread_pool is None:
+            threads = int(os.environ.get('ANSIBLE_LOCAL_THREADS') or len(self._workers) or 1)
+            self._thread_pool = ThreadPoolExecutor(max_workers=threads)
+
+        display.debug("threading %s/%s" % (host.name, task.action))
+        self._queued_task_cache[(host.name, task._uuid)] = {
+            'host': host,
+            'task': task,
+            'task_vars': task_vars,
+            'play_context': play_context,
+        }
+        self._tqm.send_callback('v2_runner_on_start', host, task)
+        # a forked worker would mutate its own copy of the task while post validating it
+        self._thread_pool.submit(self._run_in_thread, host, task.copy(exclude_parent=False),
+                                 task_vars, play_context)
+        self._pending_results += 1
+
+    def cleanup(self):
+        # every queued result has to reach the results thread before it is stopped
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=True)
+        super(ThreadedLocalMixin, self).cleanup()
+
+
+class StrategyModule(ThreadedLocalMixin, LinearStrategyModule):
+    pass
@@ -0,0 +1,22 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    strategy: local_threads_free
+    short_description: free, but action-only tasks on local hosts run in threads instead of forked workers
+    description:
+        - The local_threads strategy on top of the free strategy, see local_threads.
+    version_added: "2.19"
+'''
+
+from ansible.plugins.loader import strategy_loader
+from ansible.plugins.strategy.free import StrategyModule as FreeStrategyModule
+
+# the plugin loader imports strategy_plugins/local_threads.py as ansible.plugins.strategy.local_threads,
+# once it is loaded the mixin imports like any module's
+strategy_loader.get('local_threads', class_only=True)
+from ansible.plugins.strategy.local_threads import ThreadedLocalMixin  # noqa: E402
+
+
+class StrategyModule(ThreadedLocalMixin, FreeStrategyModule):
+    pass
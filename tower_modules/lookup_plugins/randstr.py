@@ -9,21 +9,221 @@ DOCUMENTATION = """
     short_description: generate random string
     description:
         - This lookup returns a random string.
+        - With C(count), returns that many strings, all cut from a single read of random bytes.
+        - With C(unique), no string is handed out twice in the same ansible-playbook run. Ansible forks a
+          worker for each task, so the strings handed out so far are kept in a file of the run's own,
+          under a private directory in the temporary directory, and appended to under a lock.
+          Files of runs that have ended are removed by later runs.
+    options:
+      count:
+        description: Number of strings to return.
+        type: int
+        default: 1
+      length:
+        description: Length of each string.
+        type: int
+        default: 12
+      alphabet:
+        description: Characters to build the strings from, at most 256 of them.
+        type: str
+        default: abcdefghijklmnopqrstuvwxyz
+      unique:
+        description: Never return the same string twice in this ansible-playbook run.
+        type: bool
+        default: False
+      pool_size:
+        description:
+          - Number of unique strings reserved ahead for the process each time its pool runs dry.
+          - Each task runs in a newly forked worker, and strings it reserved but did not use are
+            never handed out, so this only pays off for many unique lookups within one task.
+        type: int
+        default: 1
 """
+
+EXAMPLES = """
+- name: one name, as before
+  debug:
+    msg: "{{ lookup('randstr') }}"
+
+- name: a thousand names that are never handed out again in this run
+  debug:
+    msg: "{{ query('randstr', count=1000, length=16, unique=True) }}"
+"""
+
 from ansible.errors import AnsibleError, AnsibleParserError
 from ansible.plugins.lookup import LookupBase
 
-import string
-import random
+import errno
+import fcntl
+import hashlib
+import multiprocessing
+import os
+import stat
+import tempfile
+
+
+DEFAULT_ALPHABET = u'abcdefghijklmnopqrstuvwxyz'
+
+# unique pools by (run, length, alphabet); a forked worker drops the strings its parent
+# reserved but did not hand out, the run's file keeps them from being generated again
+_pools = {}
+_pools_pid = None
+
+
+# translation tables by alphabet
+_tables = {}
+
+
+def alphabet_tables(alphabet):
+    ''' tables mapping a random byte to an index into alphabet, and an index to an ASCII character '''
+    if alphabet not in _tables:
+        size = len(alphabet)
+        # bytes past the last whole multiple of the alphabet size are dropped to keep the choice unbiased
+        limit = 256 - 256 % size
+        chars = None
+        if all(ord(c) < 128 for c in alphabet):
+            chars = bytes(bytearray(ord(c) for c in alphabet)).ljust(256, b'\0')
+        _tables[alphabet] = (bytes(bytearray(i % size for i in range(256))), bytes(bytearray(range(limit, 256))),
+                             limit, chars)
+    return _tables[alphabet]
+
+
+def random_strings(count, length, alphabet):
+    ''' count strings of length characters from alphabet, from as few reads of os.urandom as possible '''
+    if not count:
+        return []
+    table, dropped, limit, chars = alphabet_tables(alphabet)
+    wanted = count * length
+    indexes = b''
+    while len(indexes) < wanted:
+        missing = wanted - len(indexes)
+        indexes += os.urandom(missing * 256 // limit + 16).translate(table, dropped)
+    if chars is not None:
+        text = indexes[:wanted].translate(chars).decode('ascii')
+    else:
+        text = u''.join(alphabet[i] for i in bytearray(indexes[:wanted]))
+    return [text[i:i + length] for i in range(0, wanted, length)]
+
+
+def run_pid():
+    ''' pid of the ansible-playbook process, which forks the workers for each task '''
+    parent = getattr(multiprocessing, 'parent_process', lambda: None)()
+    return parent.pid if parent is not None else os.getpid()
 
-try:
-    from __main__ import display
-except ImportError:
-    from ansible.utils.display import Display
-    display = Display()
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno != errno.ESRCH
+    return True
+
+
+def runs_dir():
+    ''' private directory for the runs' files, refusing one another user could write to '''
+    path = os.path.join(tempfile.gettempdir(), 'ansible-randstr-%d' % os.getuid())
+    try:
+        os.mkdir(path, 0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise AnsibleError('randstr: %s must be a directory only the current user can access' % path)
+    return path
+
+
+def remove_ended_runs(directory):
+    for name in os.listdir(directory):
+        pid = name.split('-', 1)[0]
+        if pid.isdigit() and not pid_alive(int(pid)):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+class UniquePool(object):
+    ''' strings of one length and alphabet, none of them ever handed out twice in the run '''
+
+    def __init__(self, run, length, alphabet):
+        directory = runs_dir()
+        self.path = os.path.join(directory, '%d-%d-%s' % (
+            run, length, hashlib.sha1(alphabet.encode('utf-8')).hexdigest()[:16]))
+        if not os.path.exists(self.path):
+            remove_ended_runs(directory)
+        self.length = length
+        self.alphabet = alphabet
+        # the run's file holds every string reserved so far, back to back, read up to offset
+        self.issued = set()
+        self.offset = 0
+        self.ready = []
+
+    def _read_issued(self, f):
+        f.seek(self.offset)
+        text = f.read().decode('utf-8')
+        self.offset = f.tell()
+        self.issued.update(text[i:i + self.length] for i in range(0, len(text), self.length))
+
+    def _reserve(self, count, pool_size):
+        ''' generates at least count strings nobody in the run has had, and records them in the run's file '''
+        with open(self.path, 'a+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self._read_issued(f)
+                left = len(self.alphabet) ** self.length - len(self.issued)
+                if count > left:
+                    raise AnsibleError('randstr: not enough unique strings of length %d left for %d more'
+                                       % (self.length, count))
+                wanted = min(max(pool_size, count), left)
+                reserved = []
+                while len(reserved) < wanted:
+                    for value in random_strings(wanted - len(reserved), self.length, self.alphabet):
+                        if value not in self.issued:
+                            self.issued.add(value)
+                            reserved.append(value)
+                f.seek(0, os.SEEK_END)
+                f.write(u''.join(reserved).encode('utf-8'))
+                f.flush()
+                self.offset = f.tell()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        self.ready.extend(reserved)
+
+    def take(self, count, pool_size):
+        if count > len(self.ready):
+            self._reserve(count - len(self.ready), pool_size)
+        taken, self.ready = self.ready[:count], self.ready[count:]
+        return taken
 
 
 class LookupModule(LookupBase):
 
     def run(self, terms, variables=None, **kwargs):
-        return [''.join(random.choice(string.ascii_lowercase) for i in range(12))]
+        global _pools_pid
+
+        if not kwargs:
+            # plain lookup('randstr') skips option resolution, which costs more than the string
+            return random_strings(1, 12, DEFAULT_ALPHABET)
+
+        self.set_options(var_options=variables, direct=kwargs)
+        count = self.get_option('count')
+        length = self.get_option('length')
+        alphabet = self.get_option('alphabet')
+        if count < 0 or length < 1:
+            raise AnsibleParserError('randstr: count must not be negative and length must be positive')
+        if not 0 < len(alphabet) <= 256 or len(set(alphabet)) != len(alphabet):
+            raise AnsibleParserError('randstr: alphabet must hold between 1 and 256 distinct characters')
+
+        if not self.get_option('unique'):
+            return random_strings(count, length, alphabet)
+
+        if _pools_pid != os.getpid():
+            for pool in _pools.values():
+                pool.ready = []
+            _pools_pid = os.getpid()
+        key = (run_pid(), length, alphabet)
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = UniquePool(key[0], length, alphabet)
+        return pool.take(count, max(self.get_option('pool_size'), 1))
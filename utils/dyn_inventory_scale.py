@@ -0,0 +1,142 @@
+"""
+What the dyn_inventory.py scripts under inventories/ share: answering --list and
+--host for their static inventory, or for a scale mode inventory of N groups x M
+hosts following the same overlap pattern, e.g. DYN_INVENTORY_GROUPS=100
+DYN_INVENTORY_HOSTS=500 (about 100k hosts).  Output is streamed, so memory stays
+flat as hosts grow.
+
+Each script only keeps its inventory and the prefix of its scale mode names:
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'utils'))
+    from dyn_inventory_scale import load_inventory
+    load_inventory(inventory, 'scale')
+
+It lives outside inventories/ so ansible does not try to parse it as an
+inventory source when a whole inventory directory is used.
+"""
+from argparse import ArgumentParser
+from types import GeneratorType
+import json
+import os
+import sys
+
+SCALE_ENV = (('num_groups', 'DYN_INVENTORY_GROUPS'), ('num_hosts', 'DYN_INVENTORY_HOSTS'))
+
+
+def group_name(prefix, index):
+    return '{}_group_{:04d}'.format(prefix, index)
+
+
+def host_names(host_set, num_hosts):
+    return ('{}_host_{:05d}'.format(host_set, i) for i in range(1, num_hosts + 1))
+
+
+def group_hosts(prefix, index, num_groups, num_hosts):
+    ''' own hosts, hosts shared with each neighbouring group, then hosts shared by every group '''
+    group = group_name(prefix, index)
+    host_sets = [group]
+    if index > 1:
+        host_sets.append('{}_and_{:04d}'.format(group_name(prefix, index - 1), index))
+    if index < num_groups:
+        host_sets.append('{}_and_{:04d}'.format(group, index + 1))
+    host_sets.append('{}_all_groups'.format(prefix))
+    for host_set in host_sets:
+        for host in host_names(host_set, num_hosts):
+            yield host
+
+
+def scale_hostvars(prefix, num_groups):
+    hostvars = {}
+    for index in range(1, num_groups + 1):
+        host = '{}_host_00001'.format(group_name(prefix, index))
+        hostvars[host] = {'{}_has_this_var'.format(host): True}
+    return hostvars
+
+
+class LazyObject(object):
+    ''' a JSON object whose (key, value) pairs are only produced while it is being encoded '''
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+
+def scale_inventory(inventory, prefix, num_groups, num_hosts):
+    ''' the scale mode inventory, keeping the all group of inventory '''
+    def pairs():
+        for index in range(1, num_groups + 1):
+            group = group_name(prefix, index)
+            yield group, {'hosts': group_hosts(prefix, index, num_groups, num_hosts),
+                          'vars': {'is_in_{}'.format(group): True}}
+        yield 'all', inventory['all']
+        yield 'ungrouped', {'hosts': host_names('{}_ungrouped'.format(prefix), num_hosts)}
+        yield '_meta', {'hostvars': scale_hostvars(prefix, num_groups)}
+    return LazyObject(pairs())
+
+
+def iterencode(obj):
+    ''' like JSONEncoder.iterencode, but consumes generators and LazyObjects as it goes '''
+    if isinstance(obj, dict):
+        obj = LazyObject(iter(obj.items()))
+    if isinstance(obj, LazyObject):
+        yield '{'
+        for i, (key, value) in enumerate(obj.pairs):
+            yield '{}{}: '.format(', ' if i else '', json.dumps(key))
+            for chunk in iterencode(value):
+                yield chunk
+        yield '}'
+    elif isinstance(obj, (list, tuple, GeneratorType)):
+        yield '['
+        for i, item in enumerate(obj):
+            if i:
+                yield ', '
+            for chunk in iterencode(item):
+                yield chunk
+        yield ']'
+    else:
+        yield json.dumps(obj)
+
+
+def write_json(obj, out=sys.stdout, buffer_size=1 << 16):
+    buf, size = [], 0
+    for chunk in iterencode(obj):
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            out.write(''.join(buf))
+            buf, size = [], 0
+    buf.append('\n')
+    out.write(''.join(buf))
+    out.flush()
+
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument('--list', dest='list_instances', action='store_true', default=True,
+                        help='List instances (default: True)')
+    parser.add_argument('--host', dest='requested_host', help='Get all the variables about a specific instance')
+    parser.add_argument('--groups', dest='num_groups', type=int,
+                        help='Scale mode: number of groups (env: DYN_INVENTORY_GROUPS)')
+    parser.add_argument('--hosts', dest='num_hosts', type=int,
+                        help='Scale mode: hosts in each host set (env: DYN_INVENTORY_HOSTS)')
+    args = parser.parse_args()
+    # the environment is only read for what the command line leaves out, so it cannot break --groups and --hosts
+    for dest, name in SCALE_ENV:
+        if getattr(args, dest) is None:
+            value = os.environ.get(name, '0')
+            try:
+                setattr(args, dest, int(value))
+            except ValueError:
+                parser.error('{} must be an integer, got {!r}'.format(name, value))
+    return args
+
+
+def load_inventory(inventory, prefix):
+    ''' writes the --list or --host answer for inventory, or for its scale mode with names starting with prefix '''
+    args = parse_args()
+    scale = args.num_groups > 0 or args.num_hosts > 0
+    num_groups, num_hosts = args.num_groups or 3, args.num_hosts or 5
+    if args.requested_host:
+        hostvars = scale_hostvars(prefix, num_groups) if scale else inventory['_meta']['hostvars']
+        write_json(hostvars.get(args.requested_host, {}))
+    elif args.list_instances:
+        write_json(scale_inventory(inventory, prefix, num_groups, num_hosts) if scale else inventory)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Exports any inventory ansible can parse into a compact snapshot for the
+snapshot inventory plugin in inventories/user_plugins/inventory_plugins.
+
+Runs of consecutively numbered hosts are written back as ranges, the way they
+are usually written in INI inventories, and group vars stay on their groups
+instead of being copied to every host.
+
+    utils/export_inventory_snapshot.py -i inventories/inventory.ini -o /tmp/inventory.snapshot.json
+"""
+from argparse import ArgumentParser
+import json
+import re
+import sys
+
+from ansible.inventory.manager import InventoryManager
+from ansible.parsing.dataloader import DataLoader
+
+try:
+    # keeps vaulted and unsafe values as they are, like inventory script output
+    from ansible._internal._json._profiles._inventory_legacy import Encoder
+except ImportError:
+    from ansible.parsing.ajson import AnsibleJSONEncoder as Encoder
+
+SNAPSHOT_VERSION = 1
+
+# set on every host by the inventory itself, the snapshot plugin sets them again
+INVENTORY_VARS = ('inventory_file', 'inventory_dir')
+
+NUMBERED = re.compile(r'^(.*?)(\d+)(\D*)$')
+
+
+def compress(names):
+    ''' host names, in order, with runs of 3 or more consecutive numbers of the same width as
+        [prefix, first, last, width, suffix] ranges '''
+    entries = []
+    run = None
+    for name in names:
+        match = NUMBERED.match(name)
+        if match:
+            prefix, digits, suffix = match.groups()
+            key = (prefix, len(digits), suffix)
+            number = int(digits)
+            if run is not None and run[0] == key and number == run[2] + 1:
+                run[2] = number
+                continue
+        if run is not None:
+            entries.extend(finish(run))
+        run = [key, number, number] if match else None
+        if not match:
+            entries.append(name)
+    if run is not None:
+        entries.extend(finish(run))
+    return entries
+
+
+def finish(run):
+    (prefix, width, suffix), first, last = run
+    if last - first >= 2:
+        return [[prefix, first, last, width, suffix]]
+    return ['%s%0*d%s' % (prefix, width, number, suffix) for number in range(first, last + 1)]
+
+
+def snapshot(inventory):
+    groups = {}
+    for name, group in inventory.groups.items():
+        groups[name] = {
+            'vars': group.vars,
+            'children': [child.name for child in group.child_groups],
+            'hosts': compress(host.name for host in group.hosts),
+        }
+    hostvars = {}
+    for name, host in inventory.hosts.items():
+        host_vars = dict((k, v) for k, v in host.vars.items() if k not in INVENTORY_VARS)
+        if host_vars:
+            hostvars[name] = host_vars
+    return {'plugin': 'snapshot', 'version': SNAPSHOT_VERSION, 'groups': groups, 'hostvars': hostvars}
+
+
+def main():
+    parser = ArgumentParser(description='Export an inventory to a compact, range preserving snapshot.')
+    parser.add_argument('-i', '--inventory', action='append', required=True, help='inventory source, may repeat')
+    parser.add_argument('-o', '--output', default='-', help='snapshot file, - for stdout')
+    args = parser.parse_args()
+
+    inventory = InventoryManager(loader=DataLoader(), sources=args.inventory)
+    data = json.dumps(snapshot(inventory), cls=Encoder, separators=(',', ':'), sort_keys=False)
+    if args.output == '-':
+        sys.stdout.write(data + '\n')
+    else:
+        with open(args.output, 'w') as f:
+            f.write(data + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+# Copyright: (c) 2018, Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    vars: vars_index
+    version_added: "2.8"
+    short_description: host_group_vars served from an index of already parsed files
+    description:
+        - Loads the same group_vars and host_vars files as host_group_vars, with the same precedence,
+          and is meant to be enabled instead of it, e.g. C(ANSIBLE_VARS_ENABLED=vars_index).
+        - Each group_vars or host_vars directory is listed once per run instead of probed with
+          several stats for every host and group.
+        - Parsed files are kept in a binary index per directory, keyed by path, mtime and size.
+          Later runs unpickle unchanged files from the index and only parse files that changed.
+        - The index holds vaulted values as ciphertext only.
+        - The index is a pickle and is trusted when loaded, so C(index_dir) must only be writable by
+          the user running ansible. It is created with mode 0700.
+    options:
+      index_dir:
+        description: Directory to keep the index files in.
+        type: path
+        default: ~/.ansible/vars_index
+        env:
+          - name: VARS_INDEX_DIR
+        ini:
+          - key: index_dir
+            section: vars_index
+      _valid_extensions:
+        default: [".yml", ".yaml", ".json"]
+        description:
+          - "Check all of these extensions when looking for 'variable' files which should be YAML or JSON or vaulted versions of these."
+        env:
+          - name: ANSIBLE_YAML_FILENAME_EXT
+        ini:
+          - key: yaml_valid_extensions
+            section: defaults
+        type: list
+        elements: string
+    extends_documentation_fragment:
+      - vars_plugin_staging
+'''
+
+import atexit
+import hashlib
+import os
+import pickle
+
+from ansible.errors import AnsibleError, AnsibleParserError
+from ansible.inventory.group import InventoryObjectType
+from ansible.module_utils.common.text.converters import to_bytes, to_native
+from ansible.plugins.vars import BaseVarsPlugin
+from ansible.release import __version__ as ansible_version
+from ansible.utils.path import basedir
+from ansible.utils.vars import combine_vars
+
+INDEX_VERSION = 1
+
+CANONICAL_PATHS = {}  # type: dict[str, str]
+NAK = set()  # type: set[str]
+# VarsIndex by group_vars/host_vars directory, for this run
+INDEXES = {}
+
+
+class VarsIndex(object):
+    ''' the listing of one group_vars or host_vars directory, and its parsed files by path '''
+
+    def __init__(self, path, index_path, extensions):
+        self.path = path
+        self.index_path = index_path
+        self.extensions = extensions
+        self.files = self._read()
+        self.found = {}
+        self.loaded = {}
+        self.dirty = False
+        self.pid = os.getpid()
+        try:
+            self.entries = dict((entry.name, entry.is_dir()) for entry in os.scandir(path))
+        except OSError:
+            self.entries = {}
+
+    def _read(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                index = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return {}
+        if index.get('version') != INDEX_VERSION or index.get('ansible') != ansible_version or index.get('path') != self.path:
+            return {}
+        return index['files']
+
+    def write(self):
+        ''' writes the index atomically, without the files that are gone '''
+        if not self.dirty:
+            return
+        files = dict((path, record) for path, record in self.files.items() if path in self.loaded or os.path.exists(path))
+        tmp_path = '%s.%d.tmp' % (self.index_path, os.getpid())
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            pickle.dump({'version': INDEX_VERSION, 'ansible': ansible_version, 'path': self.path, 'files': files},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, self.index_path)
+        self.dirty = False
+
+    def _dir_files(self, path):
+        ''' what DataLoader._get_dir_vars_files finds under path '''
+        found = []
+        for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+            if entry.name.startswith('.') or entry.name.endswith('~'):
+                continue
+            ext = os.path.splitext(entry.name)[-1]
+            if entry.is_dir() and not ext:
+                found.extend(self._dir_files(entry.path))
+            elif entry.is_file() and (not ext or ext in self.extensions):
+                found.append(entry.path)
+        return found
+
+    def find(self, name):
+        ''' what DataLoader.find_vars_files finds for name, from the one listing of the directory '''
+        if name not in self.found:
+            self.found[name] = self._find(name)
+        return self.found[name]
+
+    def _find(self, name):
+        for ext in [''] + self.extensions:
+            if '.' in ext:
+                candidate = name + ext
+            elif ext:
+                candidate = '%s.%s' % (name, ext)
+            else:
+                candidate = name
+            if candidate in self.entries:
+                path = os.path.join(self.path, candidate)
+                return self._dir_files(path) if self.entries[candidate] else [path]
+        return []
+
+    def load(self, loader, path):
+        ''' the parsed file, shared for the rest of the run like the loader's file cache does for host_group_vars '''
+        if path in self.loaded:
+            return self.loaded[path]
+        st = os.stat(path)
+        record = self.files.get(path)
+        if record is not None and record[0] == st.st_mtime_ns and record[1] == st.st_size:
+            data = pickle.loads(record[2])
+        else:
+            data = loader.load_from_file(path, cache='none', unsafe=True, trusted_as_template=True)
+            # pickled straight away, before anything can decrypt a vaulted value and store its plaintext
+            self.files[path] = (st.st_mtime_ns, st.st_size, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+            self.dirty = True
+        self.loaded[path] = data
+        return data
+
+
+def write_indexes():
+    # forked workers inherit INDEXES, only the process that built them writes them
+    for index in INDEXES.values():
+        if index.pid == os.getpid():
+            index.write()
+
+
+class VarsModule(BaseVarsPlugin):
+
+    REQUIRES_ENABLED = True
+    is_stateless = True
+
+    def _get_index(self, opath, subdir):
+        ''' the index for opath, or None if there is no such directory '''
+        if opath in INDEXES:
+            return INDEXES[opath]
+        if opath in NAK:
+            return None
+        if not os.path.isdir(opath):
+            if os.path.exists(opath):
+                self._display.warning("Found %s that is not a directory, skipping: %s" % (subdir, opath))
+            NAK.add(opath)
+            return None
+
+        index_dir = os.path.expanduser(self.get_option('index_dir'))
+        if not os.path.isdir(index_dir):
+            os.makedirs(index_dir, 0o700)
+        if not INDEXES:
+            atexit.register(write_indexes)
+        index_path = os.path.join(index_dir, hashlib.sha1(to_bytes(opath)).hexdigest() + '.idx')
+        INDEXES[opath] = VarsIndex(opath, index_path, self.get_option('_valid_extensions'))
+        return INDEXES[opath]
+
+    def get_vars(self, loader, path, entities, cache=True):
+        ''' parses the inventory file '''
+
+        if not isinstance(entities, list):
+            entities = [entities]
+
+        try:
+            realpath_basedir = CANONICAL_PATHS[path]
+        except KeyError:
+            CANONICAL_PATHS[path] = realpath_basedir = os.path.realpath(basedir(path))
+
+        data = {}
+        for entity in entities:
+            try:
+                entity_name = entity.name
+                entity_type = entity.base_type
+            except AttributeError:
+                raise AnsibleParserError("Supplied entity must be Host or Group, got %s instead" % (type(entity)))
+
+            # avoid 'chroot' type inventory hostnames /path/to/chroot
+            if not entity_name or entity_name.startswith(os.path.sep):
+                continue
+
+            if entity_type is InventoryObjectType.HOST:
+                subdir = 'host_vars'
+            elif entity_type is InventoryObjectType.GROUP:
+                subdir = 'group_vars'
+            else:
+                raise AnsibleParserError("Supplied entity must be Host or Group, got %s instead" % (type(entity)))
+
+            try:
+                index = self._get_index(os.path.join(realpath_basedir, subdir), subdir)
+                if index is None:
+                    continue
+                for found in index.find(entity_name):
+                    new_data = index.load(loader, found)
+                    if new_data:  # ignore empty files
+                        try:
+                            data = combine_vars(data, new_data)
+                        except AnsibleError as e:
+                            raise AnsibleParserError("Could not process %r." % found) from e
+            except AnsibleParserError:
+                raise
+            except Exception as e:
+                raise AnsibleParserError(to_native(e))
+        return data
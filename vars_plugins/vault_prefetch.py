@@ -0,0 +1,185 @@
+# Copyright: (c) 2018, Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    vars: vault_prefetch
+    version_added: "2.8"
+    short_description: Decrypt vaulted group_vars and host_vars up front, in a process pool
+    description:
+        - Finds the same group_vars and host_vars files as host_group_vars, loads them through the
+          loader's shared file cache, and decrypts every C(!vault) value in them at once in a pool
+          of processes.
+        - The plaintext is stored on the loaded values themselves, so host_group_vars hands out values
+          that are already decrypted, and forked workers inherit them instead of each running the
+          key derivation again for every value, host and task.
+        - Plaintext is only ever kept in memory, for the run. Identical ciphertexts are decrypted once.
+        - Contributes no variables of its own, host_group_vars still provides them.
+        - Values that cannot be decrypted here are left alone, for the normal lazy decryption to
+          report on when they are used.
+        - Enable it next to host_group_vars, e.g. C(ANSIBLE_VARS_ENABLED=host_group_vars,vault_prefetch).
+        - It relies on ansible-core internals. Where they are missing, it warns once and does nothing.
+    options:
+      workers:
+        description: Number of decryption processes, 0 for one per CPU.
+        type: int
+        default: 0
+        env:
+          - name: VAULT_PREFETCH_WORKERS
+        ini:
+          - key: workers
+            section: vault_prefetch
+      min_values:
+        description: Below this many values to decrypt, decrypt them in this process instead of starting a pool.
+        type: int
+        default: 16
+        env:
+          - name: VAULT_PREFETCH_MIN_VALUES
+        ini:
+          - key: min_values
+            section: vault_prefetch
+    extends_documentation_fragment:
+      - vars_plugin_staging
+'''
+
+import os
+
+from ansible.errors import AnsibleError, AnsibleParserError
+from ansible.module_utils.common.text.converters import to_native, to_text
+from ansible.parsing.vault import VaultLib, VaultSecret
+from ansible.plugins.vars import BaseVarsPlugin
+from ansible.utils.path import basedir
+
+try:
+    # how a decrypted value is stored on EncryptedString is private to ansible-core and may move
+    from ansible.inventory.group import InventoryObjectType
+    from ansible.parsing.vault import EncryptedString, VaultHelper, VaultSecretsContext
+    from ansible._internal._datatag._tags import VaultedValue
+    from ansible.module_utils._internal._datatag import AnsibleTagHelper
+except ImportError as e:
+    IMPORT_ERROR = e
+else:
+    IMPORT_ERROR = None
+
+# files already prefetched, and plaintext by ciphertext, for this run only
+PREFETCHED = set()
+PLAINTEXTS = {}
+
+# set in each pool process by _init_worker
+_vault = None
+
+
+def _init_worker(secrets):
+    global _vault
+    _vault = VaultLib(secrets=secrets)
+
+
+def _decrypt(ciphertext):
+    ''' runs in a pool process, returns the plaintext or None if no secret can decrypt it '''
+    try:
+        return _vault.decrypt(ciphertext)
+    except AnsibleError:
+        return None
+
+
+def find_encrypted(data, found):
+    ''' collects the EncryptedString values in data that were not decrypted yet '''
+    if isinstance(data, EncryptedString):
+        if data._plaintext is None:
+            found.append(data)
+    elif isinstance(data, dict):
+        for value in data.values():
+            find_encrypted(value, found)
+    elif isinstance(data, (list, tuple)):
+        for value in data:
+            find_encrypted(value, found)
+    return found
+
+
+def set_plaintext(value, b_plaintext):
+    ''' what EncryptedString._decrypt stores, so later use of the value skips decryption '''
+    plaintext = AnsibleTagHelper.tag(to_text(b_plaintext),
+                                     AnsibleTagHelper.tags(value) | {VaultedValue(ciphertext=value._ciphertext)})
+    object.__setattr__(value, '_plaintext', plaintext)
+
+
+class VarsModule(BaseVarsPlugin):
+
+    REQUIRES_ENABLED = True
+    is_stateless = True
+
+    def __init__(self, *args, **kwargs):
+        super(VarsModule, self).__init__(*args, **kwargs)
+        if IMPORT_ERROR is not None:
+            self._display.warning('vault_prefetch does nothing with this version of ansible-core, '
+                                  'vaulted values are decrypted as they are used: %s' % to_native(IMPORT_ERROR))
+
+    def decrypt_all(self, values):
+        context = VaultSecretsContext.current(optional=True)
+        if not values or context is None or not context.secrets:
+            return
+
+        # plain secrets, so the pool processes get nothing but the password bytes
+        secrets = [(vault_id, VaultSecret(secret.bytes)) for vault_id, secret in context.secrets]
+        pending = []
+        for value in values:
+            ciphertext = VaultHelper.get_ciphertext(value, with_tags=False)
+            if ciphertext not in PLAINTEXTS and ciphertext not in pending:
+                pending.append(ciphertext)
+
+        if len(pending) < self.get_option('min_values'):
+            _init_worker(secrets)
+            results = [_decrypt(ciphertext) for ciphertext in pending]
+        else:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            workers = self.get_option('workers') or os.cpu_count() or 1
+            # fork, so the pool starts without re-importing ansible and the secrets are never pickled
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=multiprocessing.get_context('fork'),
+                                     initializer=_init_worker, initargs=(secrets,)) as pool:
+                results = list(pool.map(_decrypt, pending, chunksize=max(1, len(pending) // (workers * 4))))
+        self._display.vvv('vault_prefetch: decrypted %d of %d vaulted values' % (
+            len([result for result in results if result is not None]), len(pending)))
+        PLAINTEXTS.update((ciphertext, result) for ciphertext, result in zip(pending, results) if result is not None)
+
+        for value in values:
+            b_plaintext = PLAINTEXTS.get(VaultHelper.get_ciphertext(value, with_tags=False))
+            if b_plaintext is not None:
+                set_plaintext(value, b_plaintext)
+
+    def get_vars(self, loader, path, entities, cache=True):
+        ''' prefetches the vaulted values in the files host_group_vars would load for entities '''
+
+        if IMPORT_ERROR is not None:
+            return {}
+
+        if not isinstance(entities, list):
+            entities = [entities]
+
+        realpath_basedir = os.path.realpath(basedir(path))
+        found = []
+        for entity in entities:
+            try:
+                subdir = 'host_vars' if entity.base_type is InventoryObjectType.HOST else 'group_vars'
+                entity_name = entity.name
+            except AttributeError:
+                raise AnsibleParserError("Supplied entity must be Host or Group, got %s instead" % (type(entity)))
+
+            opath = os.path.join(realpath_basedir, subdir)
+            if entity_name.startswith(os.path.sep) or not os.path.isdir(opath):
+                continue
+            try:
+                for found_file in loader.find_vars_files(opath, entity_name):
+                    if found_file in PREFETCHED:
+                        continue
+                    PREFETCHED.add(found_file)
+                    # same arguments as host_group_vars, so both get the same cached objects
+                    data = loader.load_from_file(found_file, cache='all', unsafe=True, trusted_as_template=True)
+                    find_encrypted(data, found)
+            except Exception as e:
+                raise AnsibleParserError(to_native(e))
+
+        self.decrypt_all(found)
+        return {}